@@ -19,7 +19,8 @@ class UserAdmin(DjangoUserAdmin):
             {
                 "fields": (
                     "user_type",
-                    "expiration_date",
+                    "expires_on",
+                    "never_expires",
                     "is_active",
                     "is_staff",
                     "is_superuser",
@@ -14,10 +14,12 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext_lazy as _
 
 from core.models import TimeStampedModel
+from core.storage import photo_storage
 
 
 class UserManager(BaseUserManager):
@@ -54,6 +56,22 @@ class UserManager(BaseUserManager):
 
         return self._create_user(email, user_type, password, **extra_fields)
 
+    def expiring_within(self, days, today=None):
+        """
+        Active members expiring in the next days, today included. One range scan
+        of the partial index on expires_on.
+        """
+        today = today or date.today()
+        return self.filter(
+            is_active=True,
+            expires_on__gte=today,
+            expires_on__lte=today + timedelta(days=days),
+        )
+
+    def expired(self, today=None):
+        """Active members whose expiration date is today or earlier"""
+        return self.filter(is_active=True, expires_on__lte=today or date.today())
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     SUPER_USER = "super_user"
@@ -72,20 +90,20 @@ class User(AbstractBaseUser, PermissionsMixin):
     )
     user_type = models.CharField(max_length=32, choices=USER_TYPE, default=GENERAL_USER)
 
+    # choices of the member forms, see expiration_choices
     EXPIRED = "expired"
-    ONE_WEEK = date.today() + timedelta(days=7)
-    ONE_MONTH = date.today() + timedelta(days=30)
-    ONE_YEAR = date.today() + timedelta(days=365)
     ENDLESSLY = "endlessly"
-    EXPIRATION_DATE = (
-        (EXPIRED, "Expired"),
-        (str(date.today() + timedelta(days=7)), "One week"),
-        (str(date.today() + timedelta(days=30)), "One month"),
-        (str(date.today() + timedelta(days=365)), "One year"),
-        (ENDLESSLY, "Endlessly"),
-    )
-    expiration_date = models.CharField(
-        max_length=150, choices=EXPIRATION_DATE, default=ENDLESSLY
+    EXPIRATION_PERIODS = (("One week", 7), ("One month", 30), ("One year", 365))
+    expires_on = models.DateField(_("expiration date"), null=True, blank=True)
+    never_expires = models.BooleanField(default=True)
+    # the old "expired" / "endlessly" / "2020-05-31" strings, read by the
+    # convert_expiration_dates command, the column is dropped after it ran
+    legacy_expiration_date = models.CharField(
+        max_length=150,
+        blank=True,
+        default="",
+        db_column="expiration_date",
+        editable=False,
     )
     email = models.EmailField(_("email address"), unique=True, null=True)
     first_name = models.CharField(_("first name"), max_length=30, blank=True)
@@ -114,6 +132,51 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = _("user")
         verbose_name_plural = _("users")
+        indexes = [
+            # UserManager.expiring_within and expired, ex: the expiration job
+            models.Index(
+                fields=["expires_on"],
+                condition=models.Q(is_active=True),
+                name="user_expiring_idx",
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.never_expires:
+            self.expires_on = None
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def expiration_choices(cls, today=None):
+        """The choices of the member forms, made per form, not when the module is loaded"""
+        today = today or date.today()
+        periods = [
+            (str(today + timedelta(days=days)), label)
+            for label, days in cls.EXPIRATION_PERIODS
+        ]
+        return [(cls.EXPIRED, "Expired")] + periods + [(cls.ENDLESSLY, "Endlessly")]
+
+    def get_expiration(self):
+        """The expiration_choices value of the user"""
+        if self.never_expires:
+            return self.ENDLESSLY
+        if not self.is_active or self.expires_on is None:
+            return self.EXPIRED
+        return str(self.expires_on)
+
+    def set_expiration(self, value):
+        """value is one of expiration_choices, or a date"""
+        if value == self.ENDLESSLY:
+            self.never_expires = True
+            self.expires_on = None
+            self.is_active = True
+        elif value == self.EXPIRED:
+            self.never_expires = False
+            self.is_active = False
+        else:
+            self.never_expires = False
+            self.expires_on = value if isinstance(value, date) else parse_date(value)
+            self.is_active = True
 
     def get_full_name(self):
         """Returns the first_name plus the last_name, with a space in between."""
@@ -136,7 +199,9 @@ class Profile(TimeStampedModel):
         blank=True, null=True, help_text="Should be entered, year-month-day"
     )
     photo = models.ImageField(
-        upload_to="profiles/", default="profiles/image-coming-soon.jpg"
+        upload_to="profiles/",
+        default="profiles/image-coming-soon.jpg",
+        storage=photo_storage,
     )
 
     def __str__(self):
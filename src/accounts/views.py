@@ -1,16 +1,17 @@
+import logging
+
 from django.contrib.auth import authenticate, get_user_model, login
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.models import Group
-from django.core.exceptions import ObjectDoesNotExist
 from django.shortcuts import redirect, render
 from django.urls import reverse
 
-from core.group_permissions import get_permissions
-
 from .forms import ProfileEditForm, UserCreationForm, UserEditForm
 from .models import Profile
 
 
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
 
@@ -26,15 +27,13 @@ def signup(request):
                 user_type=request.POST["user_type"],
                 password=request.POST["password1"],
             )
-            # get the choose group and add this user
+            # the groups are made by the sync_groups command, see core/group_permissions.py
             user_type = request.POST["user_type"]
-            try:
-                group = Group.objects.get(name=user_type)
-            except ObjectDoesNotExist:
-                group = Group.objects.create(name=user_type)
-                group.permissions.set(get_permissions(user_type))
-
-            user.groups.add(group)
+            group = Group.objects.filter(name=user_type).first()
+            if group is not None:
+                user.groups.add(group)
+            else:
+                logger.error("No group %s, run manage.py sync_groups", user_type)
 
             # login(request, user)
             return redirect(reverse("core:home"))
@@ -1,13 +1,36 @@
 from django.contrib import admin
 
-from .models import Action
+from .models import Action, ActionArchive
+from .search import search
 
 
 class ActionAdmin(admin.ModelAdmin):
     list_display = ("user", "verb", "target", "created")
     list_filter = ("created",)
-    search_fields = ("verb",)
+    # searched with the word index, see get_search_results
+    search_fields = ("target_str",)
     list_per_page = 50
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        return search(queryset, search_term), False
 
 
 admin.site.register(Action, ActionAdmin)
+
+
+class ActionArchiveAdmin(admin.ModelAdmin):
+    list_display = ("user", "verb", "target_str", "created")
+    list_filter = ("bucket",)
+    search_fields = ("verb",)
+    list_per_page = 50
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(ActionArchive, ActionArchiveAdmin)
@@ -0,0 +1,200 @@
+"""
+Write-behind buffer for the activity log, so views don't wait for it.
+create_action only adds the action to a list in memory. A thread of the process
+writes the list with bulk_create every ACTIVITY_FLUSH_INTERVAL seconds, or
+sooner when ACTIVITY_BATCH_SIZE actions are waiting, what's left is written
+when the process exits.
+The same user, verb and target within DEDUPE_SECONDS is logged once per
+process, without a query. created is the time of the write, at most
+ACTIVITY_FLUSH_INTERVAL seconds late.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    IntegrityError,
+    OperationalError,
+    close_old_connections,
+    transaction,
+)
+
+from core.metadata import content_type
+
+from .models import Action
+from .search import index_words
+
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_SECONDS = 60
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_pending = []
+# {(user id, verb, content type id, target id): time.monotonic() of the action}
+_recent = {}
+# pid of the process that started the thread, a forked worker starts its own
+_started_in = None
+
+
+def flush_interval():
+    return getattr(settings, "ACTIVITY_FLUSH_INTERVAL", 2)
+
+
+def batch_size():
+    return getattr(settings, "ACTIVITY_BATCH_SIZE", 100)
+
+
+def max_pending():
+    """Actions kept while the database is down, the oldest are dropped after"""
+    return getattr(settings, "ACTIVITY_MAX_PENDING", 10000)
+
+
+def write_behind():
+    """False writes every action right away, ex: in tests"""
+    return getattr(settings, "ACTIVITY_WRITE_BEHIND", True)
+
+
+def add(user, verb, target_str, target=None):
+    """Buffers the action, False if it's a duplicate"""
+    target_ct_id = target_id = None
+    if target is not None:
+        target_ct_id = content_type(target).pk
+        target_id = target.pk
+    key = (user.pk, verb, target_ct_id, target_id)
+    now = time.monotonic()
+    action = Action(
+        user_id=user.pk,
+        verb=verb,
+        target_ct_id=target_ct_id,
+        target_id=target_id,
+        target_str=str(target_str)[:255],
+    )
+    with _lock:
+        last = _recent.get(key)
+        if last is not None and now - last < DEDUPE_SECONDS:
+            return False
+        _recent[key] = now
+        _pending.append(action)
+        _trim()
+        full = len(_pending) >= batch_size()
+
+    if not write_behind():
+        flush()
+    else:
+        _start()
+        if full:
+            _wakeup.set()
+    return True
+
+
+def _trim():
+    """Drops the oldest actions above max_pending(), call it with _lock held"""
+    dropped = len(_pending) - max_pending()
+    if dropped > 0:
+        del _pending[:dropped]
+        logger.error("Activity buffer full, dropped %s actions", dropped)
+
+
+def _requeue(actions):
+    with _lock:
+        _pending[:0] = actions
+        _trim()
+
+
+def _write(actions):
+    # both or neither, a retry mustn't write the actions twice
+    with transaction.atomic():
+        Action.objects.bulk_create(actions, batch_size=batch_size())
+        index_words(action.target_str for action in actions)
+
+
+def _write_one_by_one(actions, retry):
+    """
+    After an IntegrityError, ex: the user or the target was deleted before the
+    flush. The actions that fail are logged and dropped. Returns the written ones.
+    """
+    written = 0
+    for index, action in enumerate(actions):
+        try:
+            _write([action])
+        except OperationalError:
+            logger.exception("Writing %s actions failed", len(actions) - index)
+            if retry:
+                _requeue(actions[index:])
+            return written
+        except IntegrityError:
+            logger.exception(
+                "Dropped action %r of user %s on %s %s",
+                action.verb,
+                action.user_id,
+                action.target_ct_id,
+                action.target_id,
+            )
+        else:
+            written += 1
+    return written
+
+
+def flush(retry=True):
+    """
+    Writes the buffered actions with bulk_create, returns how many.
+    If the database is down (OperationalError) they are put back for the next
+    flush, with retry. Rows the database refuses are dropped.
+    """
+    with _lock:
+        actions = _pending[:]
+        del _pending[:]
+        expired = time.monotonic() - DEDUPE_SECONDS
+        for key in [key for key, last in _recent.items() if last < expired]:
+            del _recent[key]
+    if not actions:
+        return 0
+
+    close_old_connections()
+    try:
+        try:
+            _write(actions)
+        except IntegrityError:
+            return _write_one_by_one(actions, retry)
+    except OperationalError:
+        logger.exception("Writing %s actions failed", len(actions))
+        if retry:
+            _requeue(actions)
+        return 0
+    except DatabaseError:
+        logger.exception("Dropped %s actions", len(actions))
+        return 0
+    return len(actions)
+
+
+def _run():
+    while True:
+        _wakeup.wait(flush_interval())
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception:
+            # the thread must keep running
+            logger.exception("Activity flush failed")
+
+
+def _drain():
+    flush(retry=False)
+
+
+def _start():
+    global _started_in
+    if _started_in == os.getpid():
+        return
+    with _lock:
+        if _started_in == os.getpid():
+            return
+        _started_in = os.getpid()
+    threading.Thread(target=_run, name="activity-flush", daemon=True).start()
+    atexit.register(_drain)
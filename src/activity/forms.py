@@ -0,0 +1,108 @@
+from datetime import datetime, time, timedelta
+
+from django import forms
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.metadata import content_types
+
+from .models import Action
+from .search import search
+
+
+VERBS_CACHE_KEY = "activity.verbs"
+
+
+def verb_suggestions():
+    """
+    The verbs in the log, cached for an hour instead of a DISTINCT per page.
+    Only suggestions, any verb can be filtered on.
+    """
+    verbs = cache.get(VERBS_CACHE_KEY)
+    if verbs is None:
+        verbs = list(
+            Action.objects.order_by("verb").values_list("verb", flat=True).distinct()
+        )
+        cache.set(VERBS_CACHE_KEY, verbs, 60 * 60)
+    return verbs
+
+
+def _start_of(date):
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+class ActionFilterForm(forms.Form):
+    """
+    Filters of the activity log, from the query string. Each filter has an
+    index starting with its column and ending with created, see Action.Meta.
+    """
+
+    user = forms.ModelChoiceField(
+        get_user_model().objects.all(),
+        to_field_name="email",
+        required=False,
+        widget=forms.TextInput(attrs={"placeholder": "Email"}),
+    )
+    verb = forms.CharField(
+        max_length=255,
+        required=False,
+        widget=forms.TextInput(attrs={"placeholder": "Verb", "list": "action-verbs"}),
+    )
+    target_type = forms.TypedChoiceField(coerce=int, required=False, empty_value=None)
+    target_id = forms.IntegerField(required=False, min_value=0)
+    date_from = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={"type": "date"})
+    )
+    date_to = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={"type": "date"})
+    )
+    q = forms.CharField(required=False, label="Search")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # for the datalist of the verb input, see activity_log.html
+        self.verbs = verb_suggestions()
+        self.fields["target_type"].choices = [("", "All")] + [
+            (content_type.pk, str(content_type)) for content_type in content_types()
+        ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if (
+            cleaned_data.get("target_id") is not None
+            and cleaned_data.get("target_type") is None
+        ):
+            self.add_error("target_type", "Choose the type of the target.")
+        return cleaned_data
+
+    def has_filters(self):
+        return self.is_valid() and any(
+            value not in (None, "") for value in self.cleaned_data.values()
+        )
+
+    def filter(self, queryset):
+        """
+        The actions matching the filters, none if the form isn't valid, the
+        errors are shown with the form
+        """
+        if not self.is_valid():
+            return queryset.none()
+        data = self.cleaned_data
+        if data["user"]:
+            queryset = queryset.filter(user=data["user"])
+        if data["verb"]:
+            queryset = queryset.filter(verb=data["verb"])
+        if data["target_type"] is not None:
+            queryset = queryset.filter(target_ct_id=data["target_type"])
+            if data["target_id"] is not None:
+                queryset = queryset.filter(target_id=data["target_id"])
+        if data["date_from"]:
+            queryset = queryset.filter(created__gte=_start_of(data["date_from"]))
+        if data["date_to"]:
+            queryset = queryset.filter(
+                created__lt=_start_of(data["date_to"] + timedelta(days=1))
+            )
+        if data["q"]:
+            queryset = search(queryset, data["q"])
+        return queryset
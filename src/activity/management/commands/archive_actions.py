@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from activity.models import Action, ActionArchive
+
+
+FIELDS = (
+    "created",
+    "modified",
+    "user_id",
+    "verb",
+    "target_ct_id",
+    "target_id",
+    "target_str",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the actions older than --days from the activity log to the archive"
+        " table, --batch-size rows per transaction. Run it from cron, ex: nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=180)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only show how many would be moved."
+        )
+
+    def move_batch(self, old, batch_size):
+        """Copies the oldest rows to the archive and deletes them, returns how many"""
+        with transaction.atomic():
+            rows = list(
+                old.order_by("created", "id").values("id", *FIELDS)[:batch_size]
+            )
+            ActionArchive.objects.bulk_create(
+                ActionArchive(
+                    bucket=row["created"].date().replace(day=1),
+                    **{field: row[field] for field in FIELDS}
+                )
+                for row in rows
+            )
+            Action.objects.filter(pk__in=[row["id"] for row in rows]).delete()
+        return len(rows)
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        old = Action.objects.filter(created__lt=before)
+        if options["dry_run"]:
+            self.stdout.write("{} actions would be archived".format(old.count()))
+            return
+
+        moved = 0
+        while True:
+            count = self.move_batch(old, options["batch_size"])
+            moved += count
+            if count < options["batch_size"]:
+                break
+        self.stdout.write("Archived {} actions".format(moved))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from activity.models import Action
+from activity.search import index_words
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the search words of the activity log from the actions. New actions"
+        " are indexed when they are written, run it once for the older ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        texts = (
+            Action.objects.order_by("target_str")
+            .values_list("target_str", flat=True)
+            .distinct()
+            .iterator()
+        )
+        batch = []
+        indexed = 0
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= options["batch_size"]:
+                index_words(batch)
+                indexed += len(batch)
+                batch = []
+        index_words(batch)
+        indexed += len(batch)
+        self.stdout.write("Indexed the words of {} texts".format(indexed))
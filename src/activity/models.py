@@ -11,7 +11,8 @@ class Action(TimeStampedModel):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="actions",
-        db_index=True,
+        # the (user, created) index starts with it
+        db_index=False,
     )
     verb = models.CharField(max_length=255)
     target_ct = models.ForeignKey(
@@ -20,10 +21,76 @@ class Action(TimeStampedModel):
         blank=True,
         null=True,
         related_name="target_obj",
+        db_index=False,
     )
-    target_id = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    target_id = models.PositiveIntegerField(null=True, blank=True)
     target = GenericForeignKey("target_ct", "target_id")
     target_str = models.CharField(max_length=255)
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            # the activity log pages, ordered by -created, -pk
+            models.Index(fields=["created", "id"], name="action_created_idx"),
+            # the filters of the activity log, each followed by the ordering
+            models.Index(fields=["user", "created"], name="action_user_idx"),
+            models.Index(fields=["verb", "created"], name="action_verb_idx"),
+            # the target type alone uses the start of it
+            models.Index(
+                fields=["target_ct", "target_id", "created"], name="action_target_idx"
+            ),
+            # the search, see ActionWord
+            models.Index(fields=["target_str", "created"], name="action_text_idx"),
+        ]
+
+
+class ActionWord(models.Model):
+    """
+    The words of the target_str of the actions, for searching the activity log
+    with indexes: word -> target_str -> actions. Filled when the actions are
+    written, index_action_words fills it for older actions.
+    """
+
+    word = models.CharField(max_length=50, db_index=True)
+    target_str = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ("word", "target_str")
+
+
+class ActionArchive(models.Model):
+    """
+    Actions moved out of Action by the archive_actions command, so the table
+    the site writes to stays small. bucket is the first day of the month of
+    created, on postgresql the table can be partitioned by it.
+    """
+
+    bucket = models.DateField()
+    created = models.DateTimeField()
+    modified = models.DateTimeField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="archived_actions",
+        db_index=False,
+    )
+    verb = models.CharField(max_length=255)
+    target_ct = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="+",
+        db_index=False,
+    )
+    target_id = models.PositiveIntegerField(null=True, blank=True)
+    target = GenericForeignKey("target_ct", "target_id")
+    target_str = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["bucket", "created"], name="archive_bucket_idx"),
+            models.Index(fields=["user", "created"], name="archive_user_idx"),
+            models.Index(fields=["target_ct", "target_id"], name="archive_target_idx"),
+        ]
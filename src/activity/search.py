@@ -0,0 +1,37 @@
+"""
+Search in the target_str of the actions. Every word of a target_str is stored
+once in ActionWord, a search term matches the start of a word, ex: "inv"
+finds "Invoice 12". All the terms of the search must match.
+"""
+import re
+
+from .models import ActionWord
+
+
+WORD = re.compile(r"\w+")
+MAX_WORD_LENGTH = ActionWord._meta.get_field("word").max_length
+
+
+def words(text):
+    return {word[:MAX_WORD_LENGTH] for word in WORD.findall(text.lower())}
+
+
+def index_words(texts, batch_size=500):
+    """Adds the words of the texts to ActionWord, the ones already there are skipped"""
+    ActionWord.objects.bulk_create(
+        (
+            ActionWord(word=word, target_str=text)
+            for text in set(texts)
+            for word in words(text)
+        ),
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def search(queryset, text):
+    """Filters the actions on the words of text"""
+    for term in words(text):
+        matches = ActionWord.objects.filter(word__startswith=term)
+        queryset = queryset.filter(target_str__in=matches.values("target_str"))
+    return queryset
@@ -1,24 +1,9 @@
-import datetime
-
-from django.contrib.contenttypes.models import ContentType
-from django.utils import timezone
-
-from .models import Action
+from . import buffer
 
 
 def create_action(user, verb, target_str, target=None):
-    now = timezone.now()
-    last_minute = now - datetime.timedelta(seconds=60)
-    similar_actions = Action.objects.filter(
-        user_id=user.id, verb=verb, created__gte=last_minute
-    )
-    if target:
-        target_ct = ContentType.objects.get_for_model(target)
-        similar_actions = similar_actions.filter(
-            target_ct=target_ct, target_id=target.id
-        )
-    if not similar_actions:
-        action = Action(user=user, verb=verb, target_str=target_str, target=target)
-        action.save()
-        return True
-    return False
+    """
+    Logs the action, False if the same one was logged in the last minute.
+    The row is written in the background, see activity/buffer.py
+    """
+    return buffer.add(user, verb, target_str, target)
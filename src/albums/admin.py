@@ -32,29 +32,17 @@ class AlbumCategoryAdmin(MPTTModelAdmin):
     def albums_link(self, albums):
         return "Category albums"
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-
-        # Add cumulative albums count
-        qs = AlbumCategory.objects.add_related_count(
-            qs, Album, "categories", "albums_cumulative_count", cumulative=True
-        )
-
-        # Add non cumulative albums count
-        qs = AlbumCategory.objects.add_related_count(
-            qs, Album, "categories", "albums_count", cumulative=False
-        )
-        return qs
-
     def related_albums_count(self, instance):
         return instance.albums_count
 
     related_albums_count.short_description = "Nr. of albums"
+    related_albums_count.admin_order_field = "albums_count"
 
     def related_albums_cumulative_count(self, instance):
         return instance.albums_cumulative_count
 
     related_albums_cumulative_count.short_description = "Nr. of albums (in tree)"
+    related_albums_cumulative_count.admin_order_field = "albums_cumulative_count"
 
 
 admin.site.register(AlbumCategory, AlbumCategoryAdmin)
@@ -1,9 +1,15 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.text import slugify
 
+from core import counters
+from core.covers import photo_added, photo_deleted
 from core.models import TimeStampedModel
+from core.slugs import save_with_unique_slug, unique_slug
+from core.storage import photo_storage
 from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
 
@@ -21,9 +27,15 @@ class AlbumCategory(MPTTModel, TimeStampedModel):
         db_index=True,
     )
     photo = models.ImageField(
-        upload_to="albums/categories/", default="profiles/image-coming-soon.jpg",
+        upload_to="albums/categories/",
+        default="profiles/image-coming-soon.jpg",
+        storage=photo_storage,
     )
     slug = models.SlugField(unique=True)
+    # nr. of albums in the category, and with the subcategories,
+    # kept up to date by core.counters
+    albums_count = models.PositiveIntegerField(default=0, editable=False)
+    albums_cumulative_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -53,23 +65,14 @@ class AlbumCategory(MPTTModel, TimeStampedModel):
 
     def _get_unique_slug(self):
         """Changes the slug if 2 or more objects are created with the same title"""
-        slug = slugify(self.name)
-        unique_slug = slug
-        num = 1
-        while AlbumCategory.objects.filter(slug=unique_slug).exists():
-            unique_slug = "{}-{}".format(slug, num)
-            num += 1
-        return unique_slug
+        return unique_slug(AlbumCategory, self.name, exclude_pk=self.pk)
 
     def save(self, *args, **kwargs):
         """Change slug if you change the title"""
-        slug = slugify(self.name)
-        if self.slug != slug:
-            self.slug = slug
-            # change the slug if if there's another instance with this slug
-            if self.slug:
-                self.slug = self._get_unique_slug()
-        super(AlbumCategory, self).save()
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # the counts are kept by core.counters, not written from the instance
+            kwargs["update_fields"] = counters.update_fields(self)
+        save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
 
 
 class Album(TimeStampedModel):
@@ -82,6 +85,15 @@ class Album(TimeStampedModel):
     categories = models.ForeignKey(
         AlbumCategory, on_delete=models.PROTECT, related_name="albums",
     )
+    # oldest photo, kept up to date by the AlbumPhotos receivers below
+    cover_photo = models.ForeignKey(
+        "AlbumPhotos",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
 
     def __str__(self):
         return self.name
@@ -93,7 +105,8 @@ class Album(TimeStampedModel):
         return reverse("albums:detail", kwargs={"pk": self.pk})
 
     def get_first_photo(self):
-        img = self.photos.last()
+        # no query if the list selects the cover_photo
+        img = self.cover_photo
         if img:
             return img.photo.url
         if not img:
@@ -113,7 +126,9 @@ def image_upload_to(instance, filename):
 
 class AlbumPhotos(TimeStampedModel):
     photo = models.ImageField(
-        upload_to=image_upload_to, default="profiles/image-coming-soon.jpg"
+        upload_to=image_upload_to,
+        default="profiles/image-coming-soon.jpg",
+        storage=photo_storage,
     )
     album = models.ForeignKey(Album, on_delete=models.CASCADE, related_name="photos")
 
@@ -122,3 +137,14 @@ class AlbumPhotos(TimeStampedModel):
 
     class Meta:
         ordering = ["-created"]
+
+
+@receiver(post_save, sender=AlbumPhotos)
+def album_photo_saved(sender, instance, created, **kwargs):
+    if created:
+        photo_added(instance, "album")
+
+
+@receiver(post_delete, sender=AlbumPhotos)
+def album_photo_deleted(sender, instance, **kwargs):
+    photo_deleted(instance, "album")
@@ -9,9 +9,16 @@ urlpatterns = [
     path("", views.AlbumList.as_view(), name="list"),
     path("categories/", views.categories, name="category_list"),
     path("create/", views.AlbumCreate.as_view(), name="create"),
+    path("reorder/", views.reorder_albums, name="album_reorder"),
+    path("categories/reorder/", views.reorder_categories, name="category_reorder"),
     path("category/create/", views.create_category, name="category_create"),
     path("category/<slug:slug>/left/", views.move_cat_left, name="category_left"),
     path("category/<slug:slug>/right/", views.move_cat_right, name="category_right",),
+    path(
+        "category/<slug:slug>/move/<int:position>/",
+        views.move_category,
+        name="category_move",
+    ),
     path("category/<slug:slug>/", views.category_detail, name="category_detail"),
     path("category/<slug:slug>/update/", views.category_edit, name="category_edit",),
     path(
@@ -20,6 +27,8 @@ urlpatterns = [
     path("<int:pk>/", views.AlbumDetail.as_view(), name="detail"),
     path("<int:pk>/left/", views.move_album_left, name="album_left"),
     path("<int:pk>/right/", views.move_album_right, name="album_right"),
+    path("<int:pk>/move/<int:position>/", views.move_album, name="album_move"),
     path("<int:pk>/update/", views.AlbumUpdate.as_view(), name="update"),
+    path("<int:pk>/photos/", views.attach_photos, name="attach_photos"),
     path("<int:pk>/delete/", views.AlbumDelete.as_view(), name="delete"),
 ]
@@ -1,6 +1,5 @@
 from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.mixins import PermissionRequiredMixin
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.db import transaction
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect, render
@@ -14,20 +13,24 @@ from django.views.generic import (
 )
 
 from activity.utils import create_action
+from core.ordering import next_position, swap_with_neighbour
+from core.pagination import paginate
+from core.trees import get_node
+from core.views import attach_uploads_view, move_view, reorder_view
 
 from .forms import AlbumCategoryCreateForm, AlbumCategoryUpdateForm, AlbumPhotosFormSet
-from .models import Album, AlbumCategory
+from .models import Album, AlbumCategory, AlbumPhotos
 
 
 @permission_required("albums.add_albumcategory", raise_exception=True)
 def create_category(request):
-    last_object = AlbumCategory.objects.order_by("-pk").first()
     form = AlbumCategoryCreateForm(request.POST or None, request.FILES or None)
     if form.is_valid():
         instance = form.save(commit=False)
         instance.user = request.user
-        instance.cat_nr = 1 if not last_object else int(last_object.cat_nr) + 1
-        instance.save()
+        with transaction.atomic():
+            instance.cat_nr = next_position(AlbumCategory, "cat_nr")
+            instance.save()
         create_action(request.user, "created category", instance, instance)
         return redirect("albums:category_list")
     context = {
@@ -60,16 +63,20 @@ def category_edit(request, slug):
 
 @permission_required("albums.view_albumcategory", raise_exception=True)
 def categories(request):
-    all_categories = AlbumCategory.objects.order_by("cat_nr")
+    all_categories = list(AlbumCategory.objects.order_by("cat_nr"))
+    for category in all_categories:
+        # nr. of albums in the category and its subcategories, without a query
+        category.node = get_node(AlbumCategory, category.pk)
     return render(request, "albums/category_list.html", {"categories": all_categories})
 
 
 @permission_required("albums.view_albumcategory", raise_exception=True)
 def category_detail(request, slug):
     category = get_object_or_404(AlbumCategory, slug=slug)
-    albums = category.albums.prefetch_related("categories").all()
+    albums = category.albums.select_related("cover_photo")
 
-    context = {"object_list": albums, "instance": category}
+    node = get_node(AlbumCategory, category.pk)
+    context = {"object_list": albums, "instance": category, "node": node}
     return render(request, "albums/category_detail.html", context)
 
 
@@ -84,48 +91,16 @@ def category_delete(request, slug):
 @permission_required("albums.view_albumcategory", raise_exception=True)
 def move_cat_left(request, slug):
     category = get_object_or_404(AlbumCategory, slug=slug)
-    current_category = category.cat_nr
-    previous_category = (
-        AlbumCategory.objects.filter(cat_nr__lt=category.cat_nr)
-        .order_by("-cat_nr")
-        .first()
-    )
-    if previous_category is not None:
-        # change cat_nr for current category with previous category
-        category_new = previous_category.cat_nr
-        category.cat_nr = category_new
-
-        # change previous category cat_nr with current category :)
-        previous_category.cat_nr = current_category
-        # save both category instances
-        category.save()
-        previous_category.save()
-    else:
-        pass
+    # swaps cat_nr with the previous category, one UPDATE without calling save()
+    swap_with_neighbour(category, "cat_nr", previous=True)
     return redirect("albums:category_list")
 
 
 @permission_required("albums.view_albumcategory", raise_exception=True)
 def move_cat_right(request, slug):
     category = get_object_or_404(AlbumCategory, slug=slug)
-    current_category = category.cat_nr
-    previous_category = (
-        AlbumCategory.objects.filter(cat_nr__gt=category.cat_nr)
-        .order_by("cat_nr")
-        .first()
-    )
-    if previous_category is not None:
-        # change cat_nr for current category with previous category
-        category_new = previous_category.cat_nr
-        category.cat_nr = category_new
-
-        # change previous category cat_nr with current category :)
-        previous_category.cat_nr = current_category
-        # save both category instances
-        category.save()
-        previous_category.save()
-    else:
-        pass
+    # swaps cat_nr with the next category, one UPDATE without calling save()
+    swap_with_neighbour(category, "cat_nr", previous=False)
     return redirect("albums:category_list")
 
 
@@ -138,22 +113,12 @@ class AlbumList(PermissionRequiredMixin, ListView):
 
     def get_context_data(self, *args, **kwargs):
         # products = Album.objects.prefetch_related("photos").all()
-        albums = Album.objects.select_related("categories").order_by("album_nr")
-
-        page = self.request.GET.get("page", 1)
-        paginator = Paginator(albums, 6)
-        try:
-            objects = paginator.page(page)
-        except PageNotAnInteger:
-            objects = paginator.page(1)
-        except EmptyPage:
-            objects = paginator.page(paginator.num_pages)
-        index = objects.number - 1
-        max_index = len(paginator.page_range)
-        start_index = index - 3 if index >= 3 else 0
-        end_index = index + 3 if index <= max_index - 3 else max_index
-        page_range = paginator.page_range[start_index:end_index]
-        context = {"object_list": objects, "page_range": page_range}
+        albums = Album.objects.select_related("categories", "cover_photo").order_by(
+            "album_nr"
+        )
+
+        objects = paginate(self.request, albums, ("album_nr", "pk"), 6)
+        context = {"object_list": objects}
         return context
 
 
@@ -172,16 +137,12 @@ class AlbumCreate(PermissionRequiredMixin, CreateView):
         return data
 
     def form_valid(self, form):
-        last_object = Album.objects.order_by("-pk").first()
         context = self.get_context_data()
         photos = context["photos"]
         with transaction.atomic():
             self.object = form.save(commit=False)
             self.object.user = self.request.user
-            # if it's first object album_nr 1 else last album_nr + 1
-            self.object.album_nr = (
-                1 if not last_object else int(last_object.album_nr) + 1
-            )
+            self.object.album_nr = next_position(Album, "album_nr")
             self.object = form.save()
             if photos.is_valid():
                 photos.instance = self.object
@@ -257,42 +218,29 @@ class AlbumDelete(PermissionRequiredMixin, DeleteView):
 @permission_required("albums.change_album", raise_exception=True)
 def move_album_left(request, pk):
     album = get_object_or_404(Album, pk=pk)
-    current_album = album.album_nr
-    previous_album = (
-        Album.objects.filter(album_nr__lt=album.album_nr).order_by("-album_nr").first()
-    )
-    if previous_album is not None:
-        # change album_nr for current album with previous album
-        album_new = previous_album.album_nr
-        album.album_nr = album_new
-
-        # change previous album album_nr with current album :)
-        previous_album.album_nr = current_album
-        # save both album instances
-        album.save()
-        previous_album.save()
-    else:
-        pass
+    # swaps album_nr with the previous album, one UPDATE without calling save()
+    swap_with_neighbour(album, "album_nr", previous=True)
     return redirect("albums:list")
 
 
 @permission_required("albums.change_album", raise_exception=True)
 def move_album_right(request, pk):
     album = get_object_or_404(Album, pk=pk)
-    current_album = album.album_nr
-    previous_album = (
-        Album.objects.filter(album_nr__gt=album.album_nr).order_by("album_nr").first()
-    )
-    if previous_album is not None:
-        # change album_nr for current album with previous album
-        album_new = previous_album.album_nr
-        album.album_nr = album_new
-
-        # change previous album album_nr with current album :)
-        previous_album.album_nr = current_album
-        # save both album instances
-        album.save()
-        previous_album.save()
-    else:
-        pass
+    # swaps album_nr with the next album, one UPDATE without calling save()
+    swap_with_neighbour(album, "album_nr", previous=False)
     return redirect("albums:list")
+
+
+move_category = move_view(
+    AlbumCategory,
+    "cat_nr",
+    "albums.change_albumcategory",
+    "albums:category_list",
+    lookup_field="slug",
+)
+reorder_categories = reorder_view(
+    AlbumCategory, "cat_nr", "albums.change_albumcategory"
+)
+move_album = move_view(Album, "album_nr", "albums.change_album", "albums:list")
+reorder_albums = reorder_view(Album, "album_nr", "albums.change_album")
+attach_photos = attach_uploads_view(Album, AlbumPhotos, "album", "albums.change_album")
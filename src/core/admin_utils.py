@@ -1,6 +1,16 @@
+from html import escape
+from urllib.parse import quote as url_quote
+
 from django.contrib.admin import SimpleListFilter
-from django.urls import reverse
-from django.utils.html import format_html
+from django.contrib.admin.utils import quote
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.safestring import SafeData, mark_safe
+
+# stands for the pk in the cached change urls, can't be in a real url
+PK_PLACEHOLDER = "__pk__"
+
+# {(script prefix, urlconf, url name): url}, see admin_url_template
+_url_templates = {}
 
 
 class InputFilter(SimpleListFilter):
@@ -23,10 +33,46 @@ class InputFilter(SimpleListFilter):
         yield all_choice
 
 
+def admin_url_template(name, with_pk=False):
+    """
+    Reverses the admin url name once per process, later calls get the cached
+    url. With with_pk, the url has PK_PLACEHOLDER where the pk goes.
+    The script prefix is part of the key, it can be different per request.
+    """
+    key = (get_script_prefix(), get_urlconf(), name)
+    url = _url_templates.get(key)
+    if url is None:
+        args = (PK_PLACEHOLDER,) if with_pk else ()
+        url = _url_templates[key] = reverse(name, args=args)
+    return url
+
+
+def clear_url_templates():
+    """ex: after changing ROOT_URLCONF in tests"""
+    _url_templates.clear()
+
+
+def _link(url, text):
+    """
+    Same as format_html('<a href="{}">{}</a>', url, text), without the lazy
+    string handling of django's escape, it's called for every row of a changelist.
+    """
+    if not isinstance(text, SafeData):
+        text = escape(str(text))
+    return mark_safe('<a href="{}">{}</a>'.format(escape(url), text))
+
+
 def admin_change_url(obj):
     app_label = obj._meta.app_label
     model_name = obj._meta.model.__name__.lower()
-    return reverse("admin:{}_{}_change".format(app_label, model_name), args=(obj.pk,))
+    url = admin_url_template(
+        "admin:{}_{}_change".format(app_label, model_name), with_pk=True
+    )
+    pk = obj.pk
+    if not isinstance(pk, int):
+        # what reverse() does to the pk: admin quoting, then url quoting
+        pk = url_quote(quote(str(pk)), safe="~")
+    return url.replace(PK_PLACEHOLDER, str(pk))
 
 
 def admin_link(attr, short_description, empty_description="-"):
@@ -52,7 +98,7 @@ def admin_link(attr, short_description, empty_description="-"):
             if related_obj is None:
                 return empty_description
             url = admin_change_url(related_obj)
-            return format_html('<a href="{}">{}</a>', url, func(self, related_obj))
+            return _link(url, func(self, related_obj))
 
         field_func.short_description = short_description
         field_func.allow_tags = True
@@ -64,7 +110,7 @@ def admin_link(attr, short_description, empty_description="-"):
 def admin_changelist_url(model):
     app_label = model._meta.app_label
     model_name = model.__name__.lower()
-    return reverse("admin:{}_{}_changelist".format(app_label, model_name))
+    return admin_url_template("admin:{}_{}_changelist".format(app_label, model_name))
 
 
 def admin_changelist_link(
@@ -97,7 +143,7 @@ def admin_changelist_link(
             url = admin_changelist_url(related_obj.model)
             if query_string:
                 url += "?" + query_string(obj)
-            return format_html('<a href="{}">{}</a>', url, func(self, related_obj))
+            return _link(url, func(self, related_obj))
 
         field_func.short_description = short_description
         field_func.allow_tags = True
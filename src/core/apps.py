@@ -1,5 +1,79 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_migrate,
+    post_save,
+    pre_delete,
+)
 
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import Group, Permission
+        from django.contrib.contenttypes.models import ContentType
+        from django.contrib.sites.models import Site
+        from mptt.signals import node_moved
+
+        from .counters import (
+            COUNTERS,
+            category_moved,
+            counts_after_migrate,
+            item_deleted,
+            item_saved,
+            remember_category,
+        )
+        from .group_permissions import groups_after_migrate
+        from .images import IMAGE_FIELDS, image_saved
+        from .metadata import membership_changed, metadata_changed
+        from .storage import names_deleted, names_saved, remember_names
+        from .trees import category_changed, item_changed
+
+        for label in {label for label, field in IMAGE_FIELDS}:
+            model = apps.get_model(label)
+            # refs of the content addressed photo files, see core/storage.py
+            post_init.connect(remember_names, sender=model)
+            post_save.connect(names_saved, sender=model)
+            pre_delete.connect(names_deleted, sender=model)
+            # variants of uploaded photos, see core/images.py
+            post_save.connect(
+                image_saved,
+                sender=model,
+                dispatch_uid="image_variants_{}".format(label),
+            )
+
+        for category_label, item_label, *fields in COUNTERS:
+            category = apps.get_model(category_label)
+            item = apps.get_model(item_label)
+            # nr. of items per category, see core/counters.py
+            post_init.connect(remember_category, sender=item)
+            # cached category trees, see core/trees.py, before item_saved, it
+            # compares the category with the one remember_category kept
+            post_save.connect(item_changed, sender=item)
+            post_save.connect(item_saved, sender=item)
+            post_delete.connect(item_deleted, sender=item)
+            node_moved.connect(category_moved, sender=category)
+            post_delete.connect(item_changed, sender=item)
+            for signal in (post_save, post_delete, node_moved):
+                signal.connect(category_changed, sender=category)
+
+        # cached site, content types and permissions, see core/metadata.py
+        for model in (Site, ContentType, Group, Permission):
+            post_save.connect(metadata_changed, sender=model)
+            post_delete.connect(metadata_changed, sender=model)
+        User = get_user_model()
+        for through in (
+            User.groups.through,
+            User.user_permissions.through,
+            Group.permissions.through,
+        ):
+            m2m_changed.connect(membership_changed, sender=through)
+
+        # groups of the user types, see core/group_permissions.py
+        post_migrate.connect(groups_after_migrate)
+        # counts of the categories, see core/counters.py
+        post_migrate.connect(counts_after_migrate)
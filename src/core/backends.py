@@ -0,0 +1,21 @@
+from django.contrib.auth.backends import ModelBackend
+
+from . import metadata
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend with the permissions of the users cached per process instead
+    of per request, see core/metadata.py
+    """
+
+    def _get_permissions(self, user_obj, obj, from_name):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        return metadata.permissions(
+            user_obj,
+            from_name,
+            lambda: super(CachedModelBackend, self)._get_permissions(
+                user_obj, obj, from_name
+            ),
+        )
@@ -1,9 +1,9 @@
-from django.contrib.sites.models import Site
+from .metadata import current_site
 
 
 def site_url(request):
     return {
-        "site": Site.objects.get_current(),
+        "site": current_site(),
         "protocol": request.is_secure() and "https" or "http",
         "request": request,
     }
@@ -0,0 +1,161 @@
+"""
+Nr. of products and albums per category, stored on the category rows, so the
+admin changelists don't need a COUNT subquery per row.
+The count is for the category itself, the cumulative count includes the
+subcategories. The receivers below (connected in CoreConfig.ready) update them
+with a couple of UPDATE statements when an item is added, moved to another
+category or deleted. reconcile_category_counts recounts everything, ex: after
+a bulk import that skipped the signals.
+"""
+from django.apps import apps
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+
+# (category model, item model, foreign key of the item model, count, cumulative count)
+COUNTERS = (
+    (
+        "products.ProductCategory",
+        "products.Product",
+        "categories",
+        "products_count",
+        "products_cumulative_count",
+    ),
+    (
+        "albums.AlbumCategory",
+        "albums.Album",
+        "categories",
+        "albums_count",
+        "albums_cumulative_count",
+    ),
+)
+
+
+def _counter(item_model):
+    label = item_model._meta.label
+    for counter in COUNTERS:
+        if counter[1] == label:
+            return counter
+    raise LookupError("No category counts for {}".format(label))
+
+
+def add(item_model, category_id, delta):
+    """Adds delta to the count of the category and the cumulative count of its path"""
+    category_label, item_label, fk_name, count, cumulative = _counter(item_model)
+    category_model = apps.get_model(category_label)
+    node = (
+        category_model.objects.filter(pk=category_id)
+        .values_list("tree_id", "lft", "rght")
+        .first()
+    )
+    if node is None:
+        # the category is being deleted with its items
+        return
+    tree_id, lft, rght = node
+    # never below 0, ex: before reconcile_category_counts ran on a new column
+    category_model.objects.filter(pk=category_id).update(
+        **{count: Greatest(F(count) + delta, 0)}
+    )
+    # the category and its ancestors
+    category_model.objects.filter(tree_id=tree_id, lft__lte=lft, rght__gte=rght).update(
+        **{cumulative: Greatest(F(cumulative) + delta, 0)}
+    )
+
+
+def update_fields(category):
+    """
+    The fields a save() of an existing category writes: all but the counts,
+    the instance may have been loaded before they changed.
+    """
+    counts = set()
+    for counter in COUNTERS:
+        if counter[0] == category._meta.label:
+            counts.update(counter[3:])
+    return [
+        field.name
+        for field in category._meta.concrete_fields
+        if not field.primary_key and field.name not in counts
+    ]
+
+
+def remember_category(sender, instance, **kwargs):
+    """post_init, the category as loaded, to know where a save moves the item from"""
+    fk_name = _counter(sender)[2]
+    # not getattr(), a deferred field would be loaded with a query per row
+    instance._counted_category_id = instance.__dict__.get(fk_name + "_id")
+
+
+def item_saved(sender, instance, created, **kwargs):
+    fk_name = _counter(sender)[2]
+    old = None if created else instance._counted_category_id
+    new = instance.__dict__.get(fk_name + "_id")
+    if old != new:
+        if old is not None:
+            add(sender, old, -1)
+        if new is not None:
+            add(sender, new, 1)
+    instance._counted_category_id = new
+
+
+def item_deleted(sender, instance, **kwargs):
+    category_id = getattr(instance, "_counted_category_id", None)
+    if category_id is not None:
+        add(sender, category_id, -1)
+
+
+def recount_cumulative(category_model):
+    """Cumulative counts from the counts, one UPDATE, ex: after a category moved"""
+    for category_label, item_label, fk_name, count, cumulative in COUNTERS:
+        if category_label == category_model._meta.label:
+            break
+    subtree = (
+        category_model.objects.filter(
+            tree_id=OuterRef("tree_id"),
+            lft__gte=OuterRef("lft"),
+            rght__lte=OuterRef("rght"),
+        )
+        .order_by()
+        .values("tree_id")
+        .annotate(total=Sum(count))
+        .values("total")
+    )
+    category_model.objects.update(
+        **{cumulative: Coalesce(Subquery(subtree, output_field=IntegerField()), 0)}
+    )
+
+
+def category_moved(sender, **kwargs):
+    """node_moved, the subtree changed ancestors"""
+    recount_cumulative(sender)
+
+
+def reconcile():
+    """Recounts every category from the items, 2 UPDATEs per model"""
+    for category_label, item_label, fk_name, count, cumulative in COUNTERS:
+        category_model = apps.get_model(category_label)
+        direct = (
+            apps.get_model(item_label)
+            .objects.filter(**{fk_name: OuterRef("pk")})
+            .order_by()
+            .values(fk_name)
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        category_model.objects.update(
+            **{count: Coalesce(Subquery(direct, output_field=IntegerField()), 0)}
+        )
+        recount_cumulative(category_model)
+
+
+def _last_counted_app():
+    labels = {label.split(".")[0] for counter in COUNTERS for label in counter[:2]}
+    return [config for config in apps.get_app_configs() if config.label in labels][-1]
+
+
+def counts_after_migrate(sender, **kwargs):
+    """
+    post_migrate receiver, connected in CoreConfig.ready. Recounts once all the
+    apps with counted models are migrated, so new count columns start right.
+    """
+    if sender.label == _last_counted_app().label:
+        reconcile()
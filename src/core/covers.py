@@ -0,0 +1,59 @@
+"""
+Cover photo of products and albums, kept in a cover_photo field so list pages
+don't run a photo query per row. The cover is the oldest photo, like
+photos.last() with the -created ordering. The photo models keep it up to date
+with post_save and post_delete receivers.
+"""
+from django.apps import apps
+from django.db.models import OuterRef, Subquery
+
+
+# (model, photo model, foreign key of the photo model)
+COVERS = (
+    ("products.Product", "products.ProductPhotos", "product"),
+    ("albums.Album", "albums.AlbumPhotos", "album"),
+)
+
+
+def photo_added(photo, fk_name):
+    """The new photo is the cover only if there isn't one yet, it's the newest"""
+    model = photo._meta.get_field(fk_name).related_model
+    model.objects.filter(
+        pk=getattr(photo, fk_name + "_id"), cover_photo__isnull=True
+    ).update(cover_photo=photo.pk)
+
+
+def refresh_covers(queryset, photo_model, fk_name):
+    """Sets the cover of every object in queryset with one UPDATE"""
+    oldest = (
+        photo_model.objects.filter(**{fk_name: OuterRef("pk")})
+        .order_by("created", "pk")
+        .values("pk")[:1]
+    )
+    return queryset.update(cover_photo=Subquery(oldest))
+
+
+def photo_deleted(photo, fk_name):
+    """
+    The cover is set to null by the foreign key when its photo is deleted,
+    the next oldest photo takes its place.
+    """
+    model = photo._meta.get_field(fk_name).related_model
+    objects = model.objects.filter(
+        pk=getattr(photo, fk_name + "_id"), cover_photo__isnull=True
+    )
+    refresh_covers(objects, type(photo), fk_name)
+
+
+def backfill(batch_size=1000):
+    """Sets the cover of every product and album, returns {model label: rows}"""
+    updated = {}
+    for label, photo_label, fk_name in COVERS:
+        model = apps.get_model(label)
+        photo_model = apps.get_model(photo_label)
+        pks = list(model.objects.order_by("pk").values_list("pk", flat=True))
+        updated[label] = 0
+        for start in range(0, len(pks), batch_size):
+            batch = model.objects.filter(pk__in=pks[start : start + batch_size])
+            updated[label] += refresh_covers(batch, photo_model, fk_name)
+    return updated
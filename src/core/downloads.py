@@ -0,0 +1,119 @@
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import iri_to_uri
+from django.utils.http import http_date, quote_etag
+
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+BLOCK_SIZE = 64 * 1024
+
+
+def content_disposition(filename, as_attachment):
+    disposition = "attachment" if as_attachment else "inline"
+    if filename:
+        disposition += '; filename="{}"'.format(filename.replace('"', ""))
+    return disposition
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) of a single "bytes=start-end" range, end included.
+    None if the header is missing or has more than one range, the whole file is sent then.
+    Raises ValueError if the range is outside of the file.
+    """
+    match = RANGE_RE.match(header or "")
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # "bytes=-500", the last 500 bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def read_range(file, start, length):
+    """Yields length bytes of the file from start, in blocks"""
+    with file:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def serve_file(
+    request, field_file, content_type, filename=None, as_attachment=False, etag=None,
+):
+    """
+    Returns a response for a stored file without reading it in python when possible.
+    - If-None-Match / If-Modified-Since answer with 304 and no body.
+    - With PROTECTED_MEDIA_ACCEL_PREFIX set, nginx sends the file (X-Accel-Redirect).
+    - Otherwise FileResponse, which gunicorn sends with sendfile.
+    - A single Range is answered with 206 and only the requested bytes.
+    etag (str):
+        Defaults to the file size and modification time, like nginx does.
+    """
+    stat = os.stat(field_file.path)
+    last_modified = int(stat.st_mtime)
+    etag = quote_etag(etag or "{:x}-{:x}".format(last_modified, stat.st_size))
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(
+            request, field_file, stat.st_size, content_type, filename, as_attachment
+        )
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def _file_response(request, field_file, size, content_type, filename, as_attachment):
+    accel_prefix = getattr(settings, "PROTECTED_MEDIA_ACCEL_PREFIX", None)
+    if accel_prefix:
+        # nginx handles Range itself for internal redirects
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = iri_to_uri(accel_prefix + field_file.name)
+        response["Content-Disposition"] = content_disposition(filename, as_attachment)
+        return response
+
+    try:
+        byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = "bytes */{}".format(size)
+        return response
+
+    if byte_range is None:
+        response = FileResponse(
+            field_file.open("rb"),
+            as_attachment=as_attachment,
+            filename=filename or "",
+            content_type=content_type,
+        )
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        read_range(field_file.open("rb"), start, length),
+        status=206,
+        content_type=content_type,
+    )
+    response["Content-Length"] = str(length)
+    response["Content-Range"] = "bytes {}-{}/{}".format(start, end, size)
+    response["Content-Disposition"] = content_disposition(filename, as_attachment)
+    return response
@@ -1,116 +1,110 @@
+"""
+The Group of every user type and its permissions, kept in sync by the
+sync_groups command, which also runs after migrate. Signup only adds the new
+user to the group of its user type.
+"""
 import logging
 
-from django.contrib.auth.models import Permission
-
-
-USER_TYPE = [
-    "ohi_user",
-    "blu_user",
-    "general_user",
-    "ohi_admin",
-    "blu_admin",
-    "super_user",
-]
-MODELS = [
-    "album",
-    "Album Category",
-    "album photos",
-    "invoice",
-    "product",
-    "Product Category",
-    "product photos",
-]
-PERMISSIONS = ["view", "add", "change", "delete"]
+from django.apps import apps
+from django.contrib.auth.models import Group, Permission
+
+
+logger = logging.getLogger(__name__)
+
+OHI_MODELS = ("albums.album", "albums.albumcategory", "albums.albumphotos")
+BLU_MODELS = (
+    "invoices.invoice",
+    "products.product",
+    "products.productcategory",
+    "products.productphotos",
+)
+ALL_MODELS = OHI_MODELS + BLU_MODELS
+
+PERMISSIONS = ("view", "add", "change", "delete")
+VIEW = ("view",)
+
+# {user type: ((models, permissions), ...)}
+ROLES = {
+    "ohi_user": ((OHI_MODELS, VIEW),),
+    "blu_user": ((BLU_MODELS, VIEW),),
+    "general_user": ((ALL_MODELS, VIEW),),
+    "ohi_admin": ((OHI_MODELS, PERMISSIONS), (BLU_MODELS, VIEW)),
+    "blu_admin": ((BLU_MODELS, PERMISSIONS), (OHI_MODELS, VIEW)),
+    "super_user": ((ALL_MODELS, PERMISSIONS),),
+}
+
+USER_TYPE = list(ROLES)
+
+
+def codenames(user_type):
+    """{(app label, codename), ...} of the user type, ex: ("albums", "view_album")"""
+    names = set()
+    for models, permissions in ROLES[user_type]:
+        for model in models:
+            app_label, model_name = model.split(".")
+            for permission in permissions:
+                names.add((app_label, "{}_{}".format(permission, model_name)))
+    return names
+
+
+def resolve(user_types, using="default"):
+    """
+    Returns {user type: [Permission, ...]} with one query for all of them.
+    Missing permissions are logged and skipped, ex: before the first migrate.
+    """
+    wanted = {user_type: codenames(user_type) for user_type in user_types}
+    every = set().union(*wanted.values())
+    found = {
+        (permission.content_type.app_label, permission.codename): permission
+        for permission in Permission.objects.using(using)
+        .filter(
+            content_type__app_label__in={app_label for app_label, _ in every},
+            codename__in={codename for _, codename in every},
+        )
+        .select_related("content_type")
+    }
+    for app_label, codename in sorted(every - set(found)):
+        logger.warning("Permission %s.%s not found.", app_label, codename)
+    return {
+        user_type: [found[name] for name in sorted(names) if name in found]
+        for user_type, names in wanted.items()
+    }
 
 
 def get_permissions(user_type):
+    """The permissions of the group of the user type"""
+    return resolve([user_type])[user_type]
+
+
+def sync_groups(using="default"):
+    """
+    Creates the missing groups and sets the permissions of every group to the
+    ones in ROLES. Running it again changes nothing. Returns the groups.
+    """
+    permissions = resolve(ROLES, using=using)
+    groups = {
+        group.name: group
+        for group in Group.objects.using(using).filter(name__in=list(ROLES))
+    }
+    for user_type in ROLES:
+        group = groups.get(user_type)
+        if group is None:
+            group = groups[user_type] = Group.objects.using(using).create(
+                name=user_type
+            )
+        group.permissions.set(permissions[user_type])
+    return groups
+
+
+def _last_role_app():
+    labels = {model.split(".")[0] for model in ALL_MODELS}
+    return [config for config in apps.get_app_configs() if config.label in labels][-1]
+
+
+def groups_after_migrate(sender, using="default", **kwargs):
     """
-    Used to create Groups for the first time, if they don't exist.
-    Depending on the user_type given on creation of the user object, user is added to Group with given permissions.
-    If the group exists then user is added to that group and this is not used at all.
+    post_migrate receiver, connected in CoreConfig.ready. The permissions of an
+    app are made by its own post_migrate, so it waits for the last app in ROLES.
     """
-    permission_list = []
-    if user_type == USER_TYPE[0]:
-        for model in MODELS[0:3]:
-            for permission in PERMISSIONS[0:1]:
-                name = "Can {} {}".format(permission, model)
-                try:
-                    model_add_perm = Permission.objects.get(name=name)
-                except Permission.DoesNotExist:
-                    logging.warning("Permission not found with name '{}'.".format(name))
-                    continue
-                permission_list.append(model_add_perm)
-    elif user_type == USER_TYPE[1]:
-        for model in MODELS[3:]:
-            for permission in PERMISSIONS[0:1]:
-                name = "Can {} {}".format(permission, model)
-                try:
-                    model_add_perm = Permission.objects.get(name=name)
-                except Permission.DoesNotExist:
-                    logging.warning("Permission not found with name '{}'.".format(name))
-                    continue
-                permission_list.append(model_add_perm)
-    elif user_type == USER_TYPE[2]:
-        for model in MODELS:
-            for permission in PERMISSIONS[0:1]:
-                print(
-                    "//////////////////////////////////////////////////////////"
-                    + permission
-                )
-                print("-----------------------------------------" + permission)
-                name = "Can {} {}".format(permission, model)
-                try:
-                    model_add_perm = Permission.objects.get(name=name)
-                except Permission.DoesNotExist:
-                    logging.warning("Permission not found with name '{}'.".format(name))
-                    continue
-                permission_list.append(model_add_perm)
-    elif user_type == USER_TYPE[3]:
-        for model in MODELS[0:3]:
-            for permission in PERMISSIONS:
-                name = "Can {} {}".format(permission, model)
-                try:
-                    model_add_perm = Permission.objects.get(name=name)
-                except Permission.DoesNotExist:
-                    logging.warning("Permission not found with name '{}'.".format(name))
-                    continue
-                permission_list.append(model_add_perm)
-        for model in MODELS[3:]:
-            for permission in PERMISSIONS[0:1]:
-                name = "Can {} {}".format(permission, model)
-                try:
-                    model_add_perm = Permission.objects.get(name=name)
-                except Permission.DoesNotExist:
-                    logging.warning("Permission not found with name '{}'.".format(name))
-                    continue
-                permission_list.append(model_add_perm)
-    elif user_type == USER_TYPE[4]:
-        for model in MODELS[3:]:
-            for permission in PERMISSIONS:
-                name = "Can {} {}".format(permission, model)
-                try:
-                    model_add_perm = Permission.objects.get(name=name)
-                except Permission.DoesNotExist:
-                    logging.warning("Permission not found with name '{}'.".format(name))
-                    continue
-                permission_list.append(model_add_perm)
-        for model in MODELS[0:3]:
-            for permission in PERMISSIONS[0:1]:
-                name = "Can {} {}".format(permission, model)
-                try:
-                    model_add_perm = Permission.objects.get(name=name)
-                except Permission.DoesNotExist:
-                    logging.warning("Permission not found with name '{}'.".format(name))
-                    continue
-                permission_list.append(model_add_perm)
-    elif user_type == USER_TYPE[5]:
-        for model in MODELS:
-            for permission in PERMISSIONS:
-                name = "Can {} {}".format(permission, model)
-                try:
-                    model_add_perm = Permission.objects.get(name=name)
-                except Permission.DoesNotExist:
-                    logging.warning("Permission not found with name '{}'.".format(name))
-                    continue
-                permission_list.append(model_add_perm)
-    return permission_list
+    if sender.label == _last_role_app().label:
+        sync_groups(using=using)
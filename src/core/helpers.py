@@ -1,6 +1,7 @@
 from copy import copy
 from io import BytesIO
 
+from django.db.models import Max
 from django.forms.models import model_to_dict
 from django.http import HttpResponse
 from django.template.loader import get_template
@@ -8,34 +9,21 @@ from django.template.loader import get_template
 from invoices.models import Invoice
 from xhtml2pdf import pisa
 
+from .sequences import allocate
+
 
 def increment_account_number():
     """
-    Get the second last created user profile account number "2357-0051",
-    the last one will be the one you're creating. Profiles are created automatically.
-    Get the number from the second part and increment it by one.
-    Or if profile account number is empty, get a number from 10 to 100
+    Returns the next invoice number, ex: "BLU-00052".
+    The number comes from the "invoices.invoice_number" sequence, so call it in the
+    transaction that saves the invoice. The sequence starts after the last primary key,
+    which the old numbers were made from.
     """
-    # profiles = Profile.objects.exclude(user__is_superuser=True)
-    # last_profile = profiles.order_by('-pk')[1]
-    last_object = Invoice.objects.order_by("-pk").first()
-    if last_object.invoice_number != "":
-        # nr = int(last_object.account_number[5:]) + 1
-        # add the first part of the account number
-        if len(str(last_object.pk)) == 1:
-            final_nr = "BLU-0000" + str(last_object.pk)
-        elif len(str(last_object.pk)) == 2:
-            final_nr = "BLU-000" + str(last_object.pk)
-        elif len(str(last_object.pk)) == 3:
-            final_nr = "BLU-00" + str(last_object.pk)
-        elif len(str(last_object.pk)) == 4:
-            final_nr = "BLU-0" + str(last_object.pk)
-        else:
-            final_nr = "BLU-" + str(last_object.pk)
-    else:
-        final_nr = "BLU-00001"
-
-    return final_nr
+    number = allocate(
+        "invoices.invoice_number",
+        start=lambda: Invoice.objects.aggregate(last=Max("pk"))["last"] or 0,
+    )
+    return "BLU-{:05d}".format(number)
 
 
 def update_field(field, obj):
@@ -51,11 +39,16 @@ def update_field(field, obj):
     return field
 
 
-def render_to_pdf(template_src, context_dict={}):
+def write_pdf(template_src, dest, context_dict={}):
+    """Renders the template as pdf into dest, a binary file object. Returns False on errors."""
     template = get_template(template_src)
     html = template.render(context_dict)
+    pdf = pisa.pisaDocument(BytesIO(html.encode("ISO-8859-1")), dest)
+    return not pdf.err
+
+
+def render_to_pdf(template_src, context_dict={}):
     result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("ISO-8859-1")), result)
-    if not pdf.err:
+    if write_pdf(template_src, result, context_dict):
         return HttpResponse(result.getvalue(), content_type="application/pdf")
     return None
@@ -0,0 +1,153 @@
+"""
+Smaller copies (variants) of uploaded photos, saved next to the original:
+products/a/photo.jpg -> products/a/photo.thumb.webp, products/a/photo.thumb.jpg, ...
+They are made by a background job after the upload, or by the
+generate_image_variants command, and used by the {% picture %} template tag.
+"""
+import os
+from functools import partial
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from PIL import Image, ImageOps
+
+from .jobs import enqueue
+from .pools import map_bounded
+
+
+# (model, image field)
+IMAGE_FIELDS = (
+    ("products.ProductPhotos", "photo"),
+    ("products.ProductCategory", "photo"),
+    ("albums.AlbumPhotos", "photo"),
+    ("albums.AlbumCategory", "photo"),
+    ("accounts.Profile", "photo"),
+)
+
+FORMATS = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+def variant_sizes():
+    """{variant: width in pixels}, see IMAGE_VARIANTS in settings.py"""
+    return getattr(
+        settings, "IMAGE_VARIANTS", {"thumb": 320, "medium": 800, "full": 1600}
+    )
+
+
+def variant_name(name, variant, image_format):
+    base, _ = os.path.splitext(name)
+    return "{}.{}.{}".format(base, variant, FORMATS[image_format])
+
+
+def variant_names(name):
+    """{(variant, format): storage name} of every variant of the image name"""
+    return {
+        (variant, image_format): variant_name(name, variant, image_format)
+        for variant in variant_sizes()
+        for image_format in FORMATS
+    }
+
+
+def render_variants(path, sizes, quality=80):
+    """
+    Returns {(variant, format): encoded image bytes} for the image at path.
+    Images are only made smaller, never bigger. Doesn't touch the database,
+    so it can run in a pool process.
+    """
+    with Image.open(path) as original:
+        original = ImageOps.exif_transpose(original)
+        rendered = {}
+        for variant, width in sizes.items():
+            image = original.copy()
+            image.thumbnail((width, width * 10), Image.LANCZOS)
+            for image_format in FORMATS:
+                output = BytesIO()
+                if image_format == "JPEG":
+                    image.convert("RGB").save(
+                        output, "JPEG", quality=quality, optimize=True, progressive=True
+                    )
+                else:
+                    image.save(output, "WEBP", quality=quality, method=4)
+                rendered[variant, image_format] = output.getvalue()
+        return rendered
+
+
+def save_variants(name, rendered, storage=default_storage):
+    for key, data in rendered.items():
+        path = variant_name(name, *key)
+        # storage.save() would pick another name if the file exists
+        storage.delete(path)
+        storage.save(path, ContentFile(data))
+
+
+def has_variants(name, storage=default_storage):
+    """True if the variants of the image are there and newer than the image"""
+    if not name:
+        return False
+    smallest = min(variant_sizes(), key=variant_sizes().get)
+    path = variant_name(name, smallest, "JPEG")
+    try:
+        return storage.get_modified_time(path) >= storage.get_modified_time(name)
+    except (OSError, NotImplementedError):
+        return False
+
+
+def generate_variants(field_file, force=False):
+    """Makes the variants of an image field, False if up to date or the file is missing"""
+    if not field_file or not field_file.storage.exists(field_file.name):
+        return False
+    if not force and has_variants(field_file.name, field_file.storage):
+        return False
+    quality = getattr(settings, "IMAGE_VARIANT_QUALITY", 80)
+    rendered = render_variants(field_file.path, variant_sizes(), quality)
+    save_variants(field_file.name, rendered, storage=field_file.storage)
+    return True
+
+
+def render_many(items, workers=None):
+    """
+    Renders the variants of many images in a process pool, see core/pools.py
+    items:
+        Iterable of (key, image path).
+    Yields (key, {(variant, format): bytes}, error).
+    """
+    render = partial(
+        render_variants,
+        sizes=variant_sizes(),
+        quality=getattr(settings, "IMAGE_VARIANT_QUALITY", 80),
+    )
+    workers = workers or getattr(settings, "IMAGE_VARIANT_WORKERS", 2)
+    return map_bounded(render, items, workers)
+
+
+def schedule_variants(instance, field):
+    label = instance._meta.label
+    return enqueue(
+        "core.images.variants_job",
+        key="{}.{}:{}".format(label, field, instance.pk),
+        model=label,
+        pk=instance.pk,
+        field=field,
+    )
+
+
+def variants_job(model, pk, field):
+    """Background job, see schedule_variants"""
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+    if instance is not None:
+        generate_variants(getattr(instance, field))
+
+
+def image_saved(sender, instance, **kwargs):
+    """post_save receiver of the IMAGE_FIELDS models, connected in CoreConfig.ready"""
+    for label, field in IMAGE_FIELDS:
+        if sender._meta.label != label:
+            continue
+        name = getattr(instance, field).name
+        # the image hasn't changed, ex: a profile saved for another field
+        if name and not has_variants(name):
+            schedule_variants(instance, field)
@@ -0,0 +1,127 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, "JOBS_MAX_ATTEMPTS", 3)
+# seconds after which a running job is thought to be lost and is run again
+TIMEOUT = getattr(settings, "JOBS_TIMEOUT", 600)
+# seconds before the first retry of a failed job, doubled for every next one
+RETRY_DELAY = getattr(settings, "JOBS_RETRY_DELAY", 30)
+
+
+def enqueue(task, key="", **kwargs):
+    """
+    Adds a job for the worker and returns it.
+    task (str):
+        Dotted path of the function that will be called with kwargs.
+    key (str):
+        If a pending job with the same task and key exists, no new job is added.
+    If JOBS_EAGER is set the job is run right away, handy when no worker is running.
+    """
+    if key:
+        job = Job.objects.filter(task=task, key=key, status=Job.PENDING).first()
+        if job is not None:
+            return job
+    job = Job.objects.create(task=task, key=key, kwargs=json.dumps(kwargs))
+    if getattr(settings, "JOBS_EAGER", False):
+        transaction.on_commit(lambda: _run_now(job))
+    return job
+
+
+def _run_now(job):
+    now = timezone.now()
+    if Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+        status=Job.RUNNING, attempts=1, claimed_at=now
+    ):
+        job.attempts = 1
+        job.claimed_at = now
+        run_job(job)
+
+
+def _lost(job):
+    """A running job that timed out without more attempts left"""
+    logger.error("Job %s timed out after %s attempts", job.pk, job.attempts)
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING, claimed_at=job.claimed_at).update(
+        status=Job.FAILED, error="Timed out after {} seconds".format(TIMEOUT)
+    )
+
+
+def claim_next():
+    """
+    Marks the oldest job that is due as running and returns it, or None if there
+    is no work. Due are the pending jobs past their run_after and the running
+    ones claimed more than TIMEOUT seconds ago, ex: the worker was killed.
+    The claim is a conditional UPDATE, so two workers never run the same job.
+    """
+    while True:
+        now = timezone.now()
+        job = (
+            Job.objects.filter(
+                Q(status=Job.PENDING, run_after__lte=now)
+                | Q(status=Job.RUNNING, claimed_at__lt=now - timedelta(seconds=TIMEOUT))
+            )
+            .order_by("created")
+            .first()
+        )
+        if job is None:
+            return None
+        if job.status == Job.RUNNING and job.attempts >= MAX_ATTEMPTS:
+            _lost(job)
+            continue
+        claimed = Job.objects.filter(
+            pk=job.pk, status=job.status, claimed_at=job.claimed_at
+        ).update(status=Job.RUNNING, attempts=job.attempts + 1, claimed_at=now)
+        if claimed:
+            job.status = Job.RUNNING
+            job.attempts += 1
+            job.claimed_at = now
+            return job
+
+
+def run_job(job):
+    """
+    Calls the job's task and records the outcome. Failed jobs are retried after
+    RETRY_DELAY seconds, then 2, 4... times as long.
+    """
+    try:
+        func = import_string(job.task)
+        func(**json.loads(job.kwargs))
+    except Exception:
+        logger.exception("Job %s failed", job.pk)
+        status = Job.PENDING if job.attempts < MAX_ATTEMPTS else Job.FAILED
+        delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+        Job.objects.filter(pk=job.pk, claimed_at=job.claimed_at).update(
+            status=status,
+            error=traceback.format_exc(),
+            run_after=timezone.now() + timedelta(seconds=delay),
+        )
+        return False
+    # not if the job timed out and another worker has claimed it since
+    Job.objects.filter(pk=job.pk, claimed_at=job.claimed_at).update(
+        status=Job.DONE, error=""
+    )
+    return True
+
+
+def run_pending(limit=None):
+    """Runs pending jobs until the queue is empty or limit jobs were run."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
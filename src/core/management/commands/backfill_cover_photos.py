@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.covers import backfill
+
+
+class Command(BaseCommand):
+    help = (
+        "Sets the cover_photo of every product and album to its oldest photo."
+        " Run it once after adding the field, the photo receivers keep it up to date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows per UPDATE statement"
+        )
+
+    def handle(self, *args, **options):
+        for label, rows in backfill(batch_size=options["batch_size"]).items():
+            self.stdout.write("Updated {} {} rows".format(rows, label))
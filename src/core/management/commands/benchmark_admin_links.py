@@ -0,0 +1,109 @@
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import reverse
+
+from accounts.models import User
+from core.admin_utils import admin_change_url
+from products.models import Product, ProductCategory
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the product admin changelist and its category links on --rows"
+        " fake products. Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000)
+        parser.add_argument(
+            "--per-page",
+            type=int,
+            default=None,
+            help="Rows on the changelist page, list_per_page of the admin by default.",
+        )
+
+    def timed(self, label, func):
+        start = time.perf_counter()
+        result = func()
+        self.stdout.write(
+            "{:<40} {:>8.0f} ms".format(label, (time.perf_counter() - start) * 1000)
+        )
+        return result
+
+    def fixture(self, rows):
+        user = User.objects.create_superuser(
+            "benchmark@example.com", "admin", "benchmark"
+        )
+        categories = [
+            ProductCategory.objects.create(name="Benchmark {}".format(i), user=user)
+            for i in range(10)
+        ]
+        Product.objects.bulk_create(
+            (
+                Product(
+                    verbose_name="Product {}".format(i),
+                    slug="benchmark-product-{}".format(i),
+                    categories=categories[i % len(categories)],
+                    user=user,
+                    product_nr=i,
+                )
+                for i in range(rows)
+            ),
+            batch_size=500,
+        )
+        return user
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["rows"], options["per_page"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, per_page):
+        user = self.timed(
+            "Fixture ({} products)".format(rows), lambda: self.fixture(rows)
+        )
+        model_admin = admin.site._registry[Product]
+        products = list(Product.objects.select_related("categories"))
+
+        self.timed(
+            "Links with reverse() per row",
+            lambda: [
+                reverse(
+                    "admin:products_productcategory_change",
+                    args=(product.categories.pk,),
+                )
+                for product in products
+            ],
+        )
+        self.timed(
+            "Links with cached url templates",
+            lambda: [admin_change_url(product.categories) for product in products],
+        )
+        self.timed(
+            "category_link column",
+            lambda: [model_admin.category_link(product) for product in products],
+        )
+
+        request = RequestFactory().get("/admin/products/product/")
+        request.user = user
+        list_per_page = model_admin.list_per_page
+        per_page = per_page or list_per_page
+        model_admin.list_per_page = per_page
+        try:
+            self.timed(
+                "Changelist ({} rows on the page)".format(per_page),
+                lambda: model_admin.changelist_view(request).render(),
+            )
+        finally:
+            model_admin.list_per_page = list_per_page
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Upload
+from core.uploads import discard
+
+
+class Command(BaseCommand):
+    help = "Deletes chunked uploads that weren't finished or attached in time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours", type=int, default=24, help="Age of the uploads to delete"
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        stale = Upload.objects.filter(modified__lt=cutoff)
+        count = 0
+        for upload in stale.iterator():
+            discard(upload)
+            count += 1
+        self.stdout.write("Deleted {} uploads".format(count))
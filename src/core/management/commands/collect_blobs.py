@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.utils import timezone
+
+from core.images import IMAGE_FIELDS, variant_names
+from core.models import Blob
+from core.storage import BLOB_DIR, photo_storage
+
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the photo blobs no row points to, with their variants."
+        " Blobs used in the last --min-age hours are kept, an upload may still be saving."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age", type=int, default=24, help="Hours")
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Count the refs again from the photo tables first.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only show what would be deleted."
+        )
+
+    def recount(self):
+        """Sets every Blob.refs from the rows, in batched UPDATEs"""
+        refs = {}
+        for label, field in IMAGE_FIELDS:
+            rows = (
+                apps.get_model(label)
+                .objects.filter(**{field + "__startswith": BLOB_DIR + "/"})
+                .values_list(field)
+                .annotate(refs=Count("pk"))
+                .order_by()
+            )
+            for name, count in rows:
+                refs[name] = refs.get(name, 0) + count
+
+        Blob.objects.exclude(name__in=list(refs)).update(refs=0)
+        names = list(refs)
+        for start in range(0, len(names), BATCH_SIZE):
+            batch = names[start : start + BATCH_SIZE]
+            whens = [When(name=name, then=Value(refs[name])) for name in batch]
+            Blob.objects.filter(name__in=batch).update(
+                refs=Case(*whens, output_field=IntegerField())
+            )
+        self.stdout.write("Counted refs of {} blobs".format(len(refs)))
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            self.recount()
+
+        cutoff = timezone.now() - timedelta(hours=options["min_age"])
+        orphans = Blob.objects.filter(refs__lte=0, modified__lt=cutoff)
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        deleted = freed = 0
+        for blob in orphans.iterator():
+            if not options["dry_run"]:
+                # conditional, a row may have started using it meanwhile
+                if not Blob.objects.filter(pk=blob.pk, refs__lte=0).delete()[0]:
+                    continue
+                for name in [blob.name, *variant_names(blob.name).values()]:
+                    photo_storage.delete(name)
+            deleted += 1
+            freed += blob.size
+            self.stdout.write("{} {}".format(verb, blob.name))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "{} {} blobs, {:.1f} MB".format(verb, deleted, freed / 1024 / 1024)
+            )
+        )
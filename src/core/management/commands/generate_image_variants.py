@@ -0,0 +1,59 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.images import IMAGE_FIELDS, has_variants, render_many, save_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Makes the thumb, medium and full WebP/JPEG variants of the uploaded photos,"
+        " ex: for photos uploaded before the variants or after changing IMAGE_VARIANTS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Processes resizing the photos, defaults to IMAGE_VARIANT_WORKERS.",
+        )
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only photos without up to date variants.",
+        )
+
+    def _images(self, missing_only):
+        """Returns {storage name: storage}, once per file, ex: the shared default photo"""
+        images = {}
+        for label, field in IMAGE_FIELDS:
+            model = apps.get_model(label)
+            storage = model._meta.get_field(field).storage
+            names = model.objects.exclude(**{field: ""}).values_list(field, flat=True)
+            for name in names.distinct().iterator():
+                if name in images:
+                    continue
+                if not storage.exists(name):
+                    self.stderr.write("Missing file {}".format(name))
+                    continue
+                if missing_only and has_variants(name, storage):
+                    continue
+                images[name] = storage
+        return images
+
+    def handle(self, *args, **options):
+        images = self._images(options["missing_only"])
+        items = ((name, storage.path(name)) for name, storage in images.items())
+        done = failed = 0
+        for name, rendered, error in render_many(items, workers=options["workers"]):
+            if error:
+                failed += 1
+                self.stderr.write("{}: {}".format(name, error))
+                continue
+            save_variants(name, rendered, storage=images[name])
+            done += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Made variants of {} photos, {} failed".format(done, failed)
+            )
+        )
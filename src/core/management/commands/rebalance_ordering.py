@@ -0,0 +1,17 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.ordering import GAP, ORDERINGS, rebalance
+
+
+class Command(BaseCommand):
+    help = (
+        "Renumbers invoice_nr, product_nr, album_nr and cat_nr {} apart, keeping the"
+        " order, so objects can be moved with one UPDATE. Run it from cron, ex: nightly."
+    ).format(GAP)
+
+    def handle(self, *args, **options):
+        for label, field in ORDERINGS:
+            model = apps.get_model(label)
+            rebalance(model, field)
+            self.stdout.write("Rebalanced {}.{}".format(label, field))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Counts the products and albums of every category again, direct and"
+        " cumulative. Run it after adding the count fields or after bulk changes."
+    )
+
+    def handle(self, *args, **options):
+        reconcile()
+        self.stdout.write(self.style.SUCCESS("Category counts rebuilt"))
@@ -0,0 +1,42 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs background jobs queued in the database, ex: invoice pdf and image"
+        " rendering. Meant to be kept alive by systemd next to gunicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the pending jobs and exit, instead of waiting for new ones.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before looking for new jobs when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        # finish the current job before exiting on systemctl stop / restart
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+            count = run_pending(limit=1)
+            if options["once"] and not count:
+                break
+            if not count:
+                time.sleep(options["sleep"])
+
+    def stop(self, signum, frame):
+        self.stopping = True
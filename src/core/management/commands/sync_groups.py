@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.group_permissions import sync_groups
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the group of every user type and sets its permissions, see"
+        " ROLES in core/group_permissions.py. Also runs after migrate."
+    )
+
+    def handle(self, *args, **options):
+        for name, group in sync_groups().items():
+            self.stdout.write(
+                "{}: {} permissions".format(name, group.permissions.count())
+            )
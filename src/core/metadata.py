@@ -0,0 +1,119 @@
+"""
+Per process cache of the metadata most pages need: the current Site, content
+types and the permissions of the users. Changing them bumps a version number in
+the Sequence table. The process that did it drops its cache at once, other
+processes notice it within METADATA_TTL seconds. In between a page makes no
+queries for them.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import SITE_CACHE, Site
+from django.db import transaction
+
+from .models import Sequence
+from .sequences import allocate
+
+
+VERSION_NAME = "metadata"
+
+# version of the cached metadata and when it was compared with the database
+_state = {"version": None, "checked": None}
+
+# {(user pk, is_superuser, "user" or "group"): {"app_label.codename", ...}}
+# least recently used first, at most METADATA_MAX_PERMISSIONS entries
+_permissions = OrderedDict()
+_permissions_lock = threading.Lock()
+
+# all the content types, ex: for choices in forms
+_content_types = []
+
+
+def _clear():
+    with _permissions_lock:
+        _permissions.clear()
+    _content_types.clear()
+    SITE_CACHE.clear()
+    ContentType.objects.clear_cache()
+
+
+def _check():
+    """Drops the cache if another process changed the metadata"""
+    ttl = getattr(settings, "METADATA_TTL", 5)
+    now = time.monotonic()
+    if _state["checked"] is not None and now - _state["checked"] < ttl:
+        return
+    version = (
+        Sequence.objects.filter(name=VERSION_NAME)
+        .values_list("value", flat=True)
+        .first()
+    )
+    if version != _state["version"]:
+        _clear()
+        _state["version"] = version
+    _state["checked"] = now
+
+
+def current_site():
+    _check()
+    return Site.objects.get_current()
+
+
+def content_type(model):
+    _check()
+    return ContentType.objects.get_for_model(model)
+
+
+def content_types():
+    """All the content types, ordered by app label and model"""
+    _check()
+    if not _content_types:
+        _content_types.extend(ContentType.objects.order_by("app_label", "model"))
+    return _content_types
+
+
+def permissions(user, kind, load):
+    """
+    The permission names of the user, load() reads them from the database when
+    they aren't cached. kind is "user" or "group", see CachedModelBackend.
+    """
+    _check()
+    key = (user.pk, user.is_superuser, kind)
+    with _permissions_lock:
+        names = _permissions.get(key)
+        if names is not None:
+            _permissions.move_to_end(key)
+            return names
+    names = frozenset(load())
+    limit = getattr(settings, "METADATA_MAX_PERMISSIONS", 2000)
+    with _permissions_lock:
+        _permissions[key] = names
+        while len(_permissions) > limit:
+            _permissions.popitem(last=False)
+    return names
+
+
+def _bump():
+    allocate(VERSION_NAME)
+    _clear()
+    # the next _check reads the new version
+    _state["checked"] = None
+
+
+def invalidate():
+    """After the commit, so the version row isn't locked for the transaction"""
+    transaction.on_commit(_bump)
+
+
+def metadata_changed(sender, **kwargs):
+    """post_save and post_delete of Site, ContentType, Group and Permission"""
+    invalidate()
+
+
+def membership_changed(sender, action, **kwargs):
+    """m2m_changed of the groups and permissions of users and groups"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate()
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class TimeStampedModel(models.Model):
@@ -12,3 +14,93 @@ class TimeStampedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Job(TimeStampedModel):
+    """
+    A unit of background work stored in the database.
+    The database doubles as the broker, so no extra service has to run next to
+    gunicorn: views enqueue rows and the `run_jobs` management command picks them up.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    # dotted path of the function that does the work, ex: invoices.utils.render_invoice
+    task = models.CharField(max_length=200)
+    # used for skipping duplicates, ex: the same invoice saved twice in a row
+    key = models.CharField(max_length=200, blank=True, db_index=True)
+    # keyword arguments for the task, json encoded
+    kwargs = models.TextField(default="{}")
+    status = models.CharField(max_length=16, choices=STATUS, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # when a worker took it, a running job claimed JOBS_TIMEOUT seconds ago is
+    # taken again, ex: the worker was killed in the middle of it
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # failed jobs wait before the next attempt, see jobs.run_job
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return "{} ({})".format(self.task, self.status)
+
+    class Meta:
+        ordering = ["created"]
+        indexes = [models.Index(fields=["status", "created"])]
+
+
+class Sequence(models.Model):
+    """
+    Last number handed out for a named counter, ex: invoices.invoice.invoice_nr.
+    Incremented with one locking UPDATE, see core.sequences.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return "{} = {}".format(self.name, self.value)
+
+
+class Upload(TimeStampedModel):
+    """
+    A file sent in chunks, see core.uploads.
+    The bytes are written straight to one file in CHUNKED_UPLOAD_DIR, offset is how
+    many of them arrived, so an interrupted upload goes on from there.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="uploads"
+    )
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return "{} ({}/{})".format(self.filename, self.offset, self.size)
+
+    def is_complete(self):
+        return self.offset >= self.size
+
+
+class Blob(TimeStampedModel):
+    """
+    A photo file stored once by its content, see core.storage.
+    refs is the nr. of rows pointing to it, blobs left with 0 are deleted by
+    the collect_blobs command.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    size = models.BigIntegerField(default=0)
+    refs = models.IntegerField(default=0, db_index=True)
+
+    def __str__(self):
+        return "{} ({} refs)".format(self.name, self.refs)
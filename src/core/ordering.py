@@ -0,0 +1,171 @@
+"""
+Manual ordering of objects by a number field, ex: invoice_nr, product_nr, album_nr, cat_nr.
+Numbers are GAP apart, so moving an object is one UPDATE of that object only:
+it gets a number between its new neighbours. When there is no room left between
+two numbers the whole field is renumbered, in the background if possible.
+"""
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Case, F, Max, Value, When
+
+from .jobs import enqueue
+from .models import Sequence
+from .sequences import next_number
+
+
+GAP = 1024
+# rows renumbered per UPDATE statement when rebalancing
+BATCH_SIZE = 500
+
+ORDERINGS = (
+    ("invoices.Invoice", "invoice_nr"),
+    ("products.Product", "product_nr"),
+    ("products.ProductCategory", "cat_nr"),
+    ("albums.Album", "album_nr"),
+    ("albums.AlbumCategory", "cat_nr"),
+)
+
+
+def sequence_name(model, field):
+    # same name as core.sequences.next_number, the sequence is shared
+    return "{}.{}".format(model._meta.label_lower, field)
+
+
+def next_position(model, field):
+    """Number for a new object, GAP after the last one"""
+    return next_number(model, field, count=GAP) + GAP - 1
+
+
+def set_positions(model, field, positions):
+    """
+    Sets many numbers with one UPDATE.
+    positions (dict):
+        {pk: number}
+    """
+    if not positions:
+        return
+    whens = [When(pk=pk, then=Value(number)) for pk, number in positions.items()]
+    model.objects.filter(pk__in=list(positions)).update(
+        **{field: Case(*whens, output_field=models.IntegerField())}
+    )
+
+
+def swap_with_neighbour(obj, field, previous=True):
+    """
+    Swaps the number of obj with the previous or next object.
+    One query for the neighbour and one UPDATE for both rows, without calling save().
+    Returns False if obj is already first or last.
+    """
+    model = type(obj)
+    number = getattr(obj, field)
+    if previous:
+        neighbours = model.objects.filter(**{field + "__lt": number}).order_by(
+            "-" + field
+        )
+    else:
+        neighbours = model.objects.filter(**{field + "__gt": number}).order_by(field)
+    neighbour = neighbours.values_list("pk", field).first()
+    if neighbour is None:
+        return False
+    neighbour_pk, neighbour_number = neighbour
+    set_positions(model, field, {obj.pk: neighbour_number, neighbour_pk: number})
+    return True
+
+
+def _neighbours(obj, field, position):
+    """Numbers of the objects that will be before and after obj at position"""
+    model = type(obj)
+    others = (
+        model.objects.exclude(pk=obj.pk)
+        .filter(**{field + "__isnull": False})
+        .order_by(field, "pk")
+        .values_list(field, flat=True)
+    )
+    if position == 0:
+        return None, others.first()
+    numbers = list(others[position - 1 : position + 1])
+    if not numbers:
+        # after the end
+        return others.aggregate(last=Max(field))["last"], None
+    return numbers[0], numbers[1] if len(numbers) > 1 else None
+
+
+def move_to(obj, field, position):
+    """
+    Moves obj to position (0 is the first) with one UPDATE of obj.
+    A background rebalance is queued when the numbers around it get too close.
+    """
+    model = type(obj)
+    position = max(position, 0)
+    before, after = _neighbours(obj, field, position)
+    if before is None and after is None:
+        return
+    if after is None:
+        number = next_position(model, field)
+    elif before is None:
+        number = after - GAP if after > GAP else after // 2
+    else:
+        number = (before + after) // 2
+
+    if number in (before, after) or number < 1:
+        # no room left, renumber everything now and try again
+        rebalance(model, field)
+        return move_to(obj, field, position)
+
+    model.objects.filter(pk=obj.pk).update(**{field: number})
+    setattr(obj, field, number)
+
+    gaps = [abs(number - n) for n in (before, after) if n is not None]
+    if min(gaps) <= 1:
+        schedule_rebalance(model, field)
+
+
+def reorder(model, field, pks):
+    """
+    Puts the objects in the order of pks, ex: after drag and drop on a list page.
+    The numbers the objects already have are handed out again in the new order,
+    so the objects that are not in pks don't move. One UPDATE for all of them.
+    """
+    numbers = sorted(
+        model.objects.filter(pk__in=pks).values_list(field, flat=True),
+        key=lambda n: (n is None, n),
+    )
+    if len(numbers) != len(pks) or None in numbers:
+        raise ValueError("Unknown, repeated or unnumbered objects in {}".format(pks))
+    set_positions(model, field, dict(zip(pks, numbers)))
+
+
+def rebalance(model, field):
+    """
+    Renumbers every object GAP apart, keeping the current order.
+    The sequence row is locked meanwhile, so no object is created in the middle of it.
+    """
+    name = sequence_name(model, field)
+    with transaction.atomic():
+        # creates the sequence row if needed, the UPDATE locks it until the commit
+        next_number(model, field, count=0)
+        pks = list(
+            model.objects.order_by(F(field).asc(nulls_last=True), "pk").values_list(
+                "pk", flat=True
+            )
+        )
+        for start in range(0, len(pks), BATCH_SIZE):
+            batch = pks[start : start + BATCH_SIZE]
+            set_positions(
+                model, field, {pk: (start + i + 1) * GAP for i, pk in enumerate(batch)},
+            )
+        Sequence.objects.filter(name=name).update(value=len(pks) * GAP)
+
+
+def schedule_rebalance(model, field):
+    return enqueue(
+        "core.ordering.rebalance_job",
+        key=sequence_name(model, field),
+        model=model._meta.label,
+        field=field,
+    )
+
+
+def rebalance_job(model, field):
+    """Background job, see schedule_rebalance"""
+    rebalance(apps.get_model(model), field)
@@ -0,0 +1,199 @@
+"""
+Keyset (cursor) pagination for list views.
+Pages are found with WHERE on the ordering columns instead of OFFSET, so page
+1000 costs the same as page 1, and there is no COUNT(*) unless it's asked for.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+
+class KeysetPage:
+    """
+    A page of objects, used by core/pagination.html.
+    Iterating it gives the objects of the page.
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, keys, query, has_next, has_previous, count=None):
+        self.object_list = object_list
+        self.keys = keys
+        self.query = query
+        self.has_next = has_next
+        self.has_previous = has_previous
+        # None if not asked for, approximate if approximate_count was used
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def _url(self, **params):
+        query = self.query.copy()
+        for key in ("after", "before"):
+            query.pop(key, None)
+        for key, value in params.items():
+            query[key] = value
+        return "?" + query.urlencode()
+
+    def first_url(self):
+        return self._url()
+
+    def last_url(self):
+        return self._url(before="")
+
+    def next_url(self):
+        return self._url(after=encode_cursor(self.object_list[-1], self.keys))
+
+    def previous_url(self):
+        return self._url(before=encode_cursor(self.object_list[0], self.keys))
+
+
+def _key_value(obj, key):
+    value = getattr(obj, key.lstrip("-"))
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def encode_cursor(obj, keys):
+    values = [_key_value(obj, key) for key in keys]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _field(model, name):
+    return model._meta.pk if name == "pk" else model._meta.get_field(name)
+
+
+def decode_cursor(cursor, model, keys):
+    """Returns the values of the keys in the cursor, ValueError if it's broken"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("Invalid cursor")
+    fields = [_field(model, key.lstrip("-")) for key in keys]
+    try:
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except ValidationError as e:
+        # ex: ["abc", 1] for an integer key
+        raise ValueError("Invalid cursor") from e
+
+
+def _nulls_largest():
+    """
+    True if the database sorts NULL after the other values in ascending order,
+    like postgresql and oracle, sqlite and mysql sort it first.
+    """
+    return connection.vendor in ("postgresql", "oracle")
+
+
+def _after(keys, values, reverse=False):
+    """
+    Q for the rows after values in the keys ordering, ex: for keys (a, b)
+    (a > x) OR (a = x AND b > y). With reverse, the rows before them.
+    Nullable keys, ex: product_nr, get isnull branches in the place the database
+    sorts NULL, the last key must not be nullable.
+    """
+    query = Q()
+    equal = Q()
+    for key, value in zip(keys, values):
+        name = key.lstrip("-")
+        descending = key.startswith("-") != reverse
+        # NULL comes after the other values in this direction
+        nulls_after = _nulls_largest() != descending
+        null = Q(**{"{}__isnull".format(name): True})
+        if value is None:
+            if not nulls_after:
+                query |= equal & ~null
+            equal &= null
+            continue
+        lookup = "{}__{}".format(name, "lt" if descending else "gt")
+        following = Q(**{lookup: value})
+        if nulls_after:
+            following |= null
+        query |= equal & following
+        equal &= Q(**{name: value})
+    return query
+
+
+def _reverse(keys):
+    return [key[1:] if key.startswith("-") else "-" + key for key in keys]
+
+
+def per_page(request, default, maximum=100):
+    """Page size from ?per_page=, default if it's missing or not a number"""
+    try:
+        size = int(request.GET.get("per_page", default))
+    except ValueError:
+        return default
+    return min(max(size, 1), maximum)
+
+
+def estimated_count(queryset):
+    """
+    Estimated number of rows, from the planner statistics on postgresql when the
+    queryset isn't filtered. Anywhere else it's a normal count.
+    """
+    if connection.vendor == "postgresql" and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    return queryset.count()
+
+
+def paginate(request, queryset, keys, per_page, count=False, approximate_count=False):
+    """
+    Returns the KeysetPage asked for with ?after=<cursor> or ?before=<cursor>,
+    the first page without them, the last page with an empty ?before=.
+    keys (tuple):
+        Ordering columns, the last one must be unique, ex: ("product_nr", "pk")
+        or ("-created", "-pk"). The page is ordered by them.
+    count (bool):
+        Adds the total count to the page, approximate_count is cheaper for big tables.
+    """
+    keys = list(keys)
+    after = request.GET.get("after")
+    before = request.GET.get("before")
+    total = None
+    if approximate_count:
+        total = estimated_count(queryset)
+    elif count:
+        total = queryset.count()
+
+    try:
+        if after:
+            values = decode_cursor(after, queryset.model, keys)
+            queryset = queryset.filter(_after(keys, values))
+        elif before:
+            values = decode_cursor(before, queryset.model, keys)
+            queryset = queryset.filter(_after(keys, values, reverse=True))
+    except ValueError:
+        # a broken cursor shows the first page
+        after = before = None
+
+    backwards = before is not None and not after
+    ordering = _reverse(keys) if backwards else keys
+    # one more row tells if there is another page
+    rows = list(queryset.order_by(*ordering)[: per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_next, has_previous = bool(before), more
+    else:
+        has_next, has_previous = more, bool(after)
+    return KeysetPage(rows, keys, request.GET, has_next, has_previous, count=total)
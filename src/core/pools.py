@@ -0,0 +1,43 @@
+"""
+Bounded process pool for the commands that render many files, ex: image
+variants, invoice thumbnails and the pdfs of the invoice export.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+
+def _call(func, key, argument):
+    try:
+        return key, func(argument), None
+    except Exception as e:
+        # one broken file shouldn't stop the others
+        return key, None, str(e)
+
+
+def map_bounded(func, items, workers=None):
+    """
+    Calls func(argument) in a process pool, func must be picklable, ex: a module
+    level function or a functools.partial of one.
+    items:
+        Iterable of (key, argument).
+    Yields (key, result, error) in the order of items. At most 2 * workers items
+    are waiting in the pool, so memory doesn't grow with the nr. of items.
+    """
+    workers = workers or os.cpu_count() or 1
+    # forked processes must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        try:
+            for key, argument in items:
+                pending.append(executor.submit(_call, func, key, argument))
+                if len(pending) >= 2 * workers:
+                    yield pending.pop(0).result()
+            while pending:
+                yield pending.pop(0).result()
+        finally:
+            # ex: the caller stopped early, don't wait for the rest
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,75 @@
+import sqlite3
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+
+from .models import Sequence
+
+
+def _increment_returning(name, count):
+    """UPDATE ... RETURNING, one round trip on postgresql and sqlite >= 3.35"""
+    table = connection.ops.quote_name(Sequence._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE {} SET value = value + %s WHERE name = %s RETURNING value".format(
+                table
+            ),
+            [count, name],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _increment_locking(name, count):
+    with transaction.atomic():
+        sequence = Sequence.objects.select_for_update().filter(name=name).first()
+        if sequence is None:
+            return None
+        sequence.value += count
+        sequence.save(update_fields=["value"])
+    return sequence.value
+
+
+def _supports_returning():
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def allocate(name, count=1, start=None):
+    """
+    Reserves count consecutive numbers of the sequence name and returns the first one.
+    Call it in the same transaction.atomic() block that saves the numbered objects:
+    the sequence row stays locked until the commit, so concurrent workers wait for
+    each other instead of getting the same number, and a rollback gives the numbers
+    back, so there are no gaps.
+    start (callable):
+        Returns the last number used before the sequence existed, ex: the current
+        max of the field. Called only once, when the sequence row is created.
+    """
+    increment = _increment_returning if _supports_returning() else _increment_locking
+    value = increment(name, count)
+    if value is None:
+        try:
+            with transaction.atomic():
+                Sequence.objects.create(name=name, value=start() if start else 0)
+        except IntegrityError:
+            # created by another worker in the meantime
+            pass
+        value = increment(name, count)
+    return value - count + 1
+
+
+def next_number(model, field, count=1):
+    """
+    Next value for a numbering field like invoice_nr, product_nr, album_nr or cat_nr.
+    The sequence continues from the highest value already in the table.
+    """
+    name = "{}.{}".format(model._meta.label_lower, field)
+
+    def start():
+        return model.objects.aggregate(last=Max(field))["last"] or 0
+
+    return allocate(name, count=count, start=start)
@@ -0,0 +1,97 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+# bases looked up per query in unique_slugs
+BATCH_SIZE = 100
+
+
+def _taken_query(field, base):
+    # "base" or "base-..." as a prefix lookup, so the index on the slug is used
+    return Q(**{field: base}) | Q(**{field + "__startswith": base + "-"})
+
+
+def _suffix(slug, base):
+    """1 for "base", n + 1 for "base-n", None if the slug isn't made from base"""
+    if slug == base:
+        return 1
+    match = re.fullmatch(re.escape(base) + r"-(\d+)", slug)
+    return int(match.group(1)) + 1 if match else None
+
+
+def _next_free(base, taken):
+    """First slug after the highest suffix in taken: "base", "base-1", "base-2", ..."""
+    suffixes = [_suffix(slug, base) for slug in taken]
+    suffixes = [n for n in suffixes if n is not None]
+    if not suffixes:
+        return base
+    return "{}-{}".format(base, max(suffixes))
+
+
+def unique_slug(model, value, field="slug", exclude_pk=None):
+    """
+    Returns a free slug for value: "name", or "name-n" after the highest n in use.
+    One query for the slugs with the same base, instead of one query per suffix.
+    """
+    base = slugify(value)
+    taken = model._default_manager.filter(_taken_query(field, base))
+    if exclude_pk is not None:
+        taken = taken.exclude(pk=exclude_pk)
+    return _next_free(base, taken.values_list(field, flat=True))
+
+
+def unique_slugs(model, values, field="slug"):
+    """
+    Bulk mode for imports: returns a free slug for each value, also unique among
+    themselves, ex: to set them before bulk_create. One query per BATCH_SIZE names.
+    """
+    bases = {slugify(value) for value in values}
+    taken = {base: [] for base in bases}
+    ordered = sorted(bases)
+    for start in range(0, len(ordered), BATCH_SIZE):
+        batch = ordered[start : start + BATCH_SIZE]
+        query = reduce(or_, (_taken_query(field, base) for base in batch))
+        for slug in model._default_manager.filter(query).values_list(field, flat=True):
+            for base in batch:
+                if _suffix(slug, base) is not None:
+                    taken[base].append(slug)
+
+    slugs = []
+    for value in values:
+        base = slugify(value)
+        slug = _next_free(base, taken[base])
+        taken[base].append(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def save_with_unique_slug(instance, value, save, *args, field="slug", **kwargs):
+    """
+    Calls save(*args, **kwargs) after setting a unique slug made from value.
+    An object keeps its slug while value gives the same base, ex: "name-2" stays
+    "name-2". If another request takes the slug between the lookup and the insert,
+    the unique index raises IntegrityError and a new slug is looked up.
+    """
+    base = slugify(value)
+    current = getattr(instance, field)
+    if not base or (current and _suffix(current, base) is not None):
+        return save(*args, **kwargs)
+
+    attempts = 3
+    for attempt in range(attempts):
+        setattr(
+            instance,
+            field,
+            unique_slug(type(instance), value, field=field, exclude_pk=instance.pk),
+        )
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
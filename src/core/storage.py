@@ -0,0 +1,139 @@
+"""
+Content addressed storage for photos: a file is stored under the sha256 of its
+content, blobs/ab/cd/abcd....jpg, so the same photo uploaded to several albums,
+products, categories or profiles is on disk once. Blob.refs counts the rows
+using it, kept up to date by the receivers below (connected in CoreConfig.ready).
+Files saved before this keep their old names and are served as before.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .models import Blob
+
+
+BLOB_DIR = "blobs"
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_DIR + "/")
+
+
+def blob_name(digest, extension):
+    return "{}/{}/{}/{}{}".format(
+        BLOB_DIR, digest[:2], digest[2:4], digest, extension.lower()
+    )
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that saves each distinct content once.
+    save() returns the name of the blob, the name asked for (from upload_to)
+    only gives the extension. Names under blobs/ are saved as they are,
+    ex: the variants of a blob made by core.images.
+    """
+
+    def _save(self, name, content):
+        if is_blob(name):
+            return super()._save(name, content)
+
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        name = blob_name(digest.hexdigest(), os.path.splitext(name)[1])
+
+        if self.exists(name):
+            if hasattr(content, "temporary_file_path"):
+                # a finished chunked upload would otherwise be left behind
+                os.remove(content.temporary_file_path())
+        else:
+            self._save_once(name, content)
+        # get_or_create gets the row if another upload created it meanwhile
+        blob, created = Blob.objects.get_or_create(name=name, defaults={"size": size})
+        if not created:
+            # collect_blobs leaves blobs alone for a while after they are used
+            Blob.objects.filter(pk=blob.pk).update(modified=timezone.now())
+        return name
+
+    def _save_once(self, name, content):
+        """
+        Writes the content to a temporary name and links it as name, so the
+        blob is complete once it exists. If another upload of the same content
+        linked it first, this copy is removed.
+        """
+        if not hasattr(content, "temporary_file_path"):
+            content.seek(0)
+        temporary = super()._save(name + ".tmp", content)
+        try:
+            os.link(self.path(temporary), self.path(name))
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(self.path(temporary))
+
+
+photo_storage = ContentAddressedStorage()
+
+
+def add_refs(name, count):
+    if is_blob(name):
+        Blob.objects.filter(name=name).update(refs=F("refs") + count)
+
+
+def _blob_fields(sender):
+    from .images import IMAGE_FIELDS
+
+    label = sender._meta.label
+    return [field for model, field in IMAGE_FIELDS if model == label]
+
+
+def _loaded_name(instance, field):
+    # not getattr(), a deferred field would be loaded with a query per row.
+    # A str before the field is used, a FieldFile after
+    value = instance.__dict__[field]
+    return getattr(value, "name", value)
+
+
+def remember_names(sender, instance, **kwargs):
+    """
+    post_init, the file names as loaded, to know which blob a save replaces.
+    Deferred fields are left out, ex: only() in the list views.
+    """
+    instance._blob_names = {
+        field: _loaded_name(instance, field)
+        for field in _blob_fields(sender)
+        if field in instance.__dict__
+    }
+
+
+def names_saved(sender, instance, **kwargs):
+    """post_save, moves the refs from the old files to the new ones"""
+    old_names = getattr(instance, "_blob_names", {})
+    for field in _blob_fields(sender):
+        if field not in old_names:
+            # deferred when loaded, save() doesn't write it unless it was set
+            # meanwhile, then collect_blobs --recount corrects the refs
+            continue
+        old, new = old_names[field], getattr(instance, field).name
+        if old != new:
+            add_refs(new, 1)
+            add_refs(old, -1)
+    remember_names(sender, instance)
+
+
+def names_deleted(sender, instance, **kwargs):
+    """pre_delete, the blobs lose the ref of the row"""
+    names = getattr(instance, "_blob_names", {})
+    for field in _blob_fields(sender):
+        if field in names:
+            add_refs(names[field], -1)
+        else:
+            # deferred, loaded while the row is still there
+            add_refs(getattr(instance, field).name, -1)
@@ -0,0 +1,62 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from core.images import FORMATS, has_variants, variant_name, variant_sizes
+
+
+register = template.Library()
+
+
+def _srcset(field_file, image_format):
+    return ", ".join(
+        "{} {}w".format(
+            field_file.storage.url(
+                variant_name(field_file.name, variant, image_format)
+            ),
+            width,
+        )
+        for variant, width in sorted(variant_sizes().items(), key=lambda v: v[1])
+    )
+
+
+@register.simple_tag
+def variant_url(field_file, variant="thumb", image_format="JPEG"):
+    """Url of one variant, the original's url if the variants aren't made yet"""
+    if not field_file:
+        return ""
+    if not has_variants(field_file.name, field_file.storage):
+        return field_file.url
+    return field_file.storage.url(variant_name(field_file.name, variant, image_format))
+
+
+@register.simple_tag
+def picture(field_file, alt="", sizes="100vw", css_class="", default=""):
+    """
+    <picture> with a WebP srcset and a JPEG srcset fallback, so the browser
+    downloads the smallest variant that fits.
+    Falls back to a plain <img> of the original or of default.
+    Ex: {% picture product.cover_photo.photo alt=product.verbose_name sizes="33vw" %}
+    """
+    if not field_file or not has_variants(field_file.name, field_file.storage):
+        src = field_file.url if field_file else default
+        return format_html('<img src="{}" alt="{}" class="{}">', src, alt, css_class)
+    sources = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (extension, _srcset(field_file, image_format), sizes)
+            for image_format, extension in FORMATS.items()
+            if image_format != "JPEG"
+        ),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}"></picture>',
+        sources,
+        field_file.storage.url(variant_name(field_file.name, "medium", "JPEG"))
+        if "medium" in variant_sizes()
+        else field_file.url,
+        _srcset(field_file, "JPEG"),
+        sizes,
+        alt,
+        css_class,
+    )
@@ -0,0 +1,185 @@
+"""
+In-process snapshot of the product and album category trees.
+The whole tree is read with one query, the nr. of items per category comes from
+the counts kept by core.counters. After that children, ancestors, descendants
+and counts are answered without queries. Saving, moving or deleting a category,
+or an item, bumps a version number in the Sequence table. The process that did
+it rebuilds at once, other processes notice it within CATEGORY_TREE_TTL seconds.
+"""
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+
+from .counters import COUNTERS
+from .models import Sequence
+from .sequences import allocate
+
+
+FIELDS = ("pk", "parent_id", "tree_id", "lft", "rght", "level", "name", "slug")
+
+# {category label: (tree, version, checked at)}
+_snapshots = {}
+
+
+class Node:
+    """One category, count is the nr. of its own items, total includes descendants"""
+
+    def __init__(self, pk, parent_id, tree_id, lft, rght, level, name, slug, count):
+        self.pk = pk
+        self.parent_id = parent_id
+        self.tree_id = tree_id
+        self.lft = lft
+        self.rght = rght
+        self.level = level
+        self.name = name
+        self.slug = slug
+        self.parent = None
+        self.children = []
+        self.count = count
+        # summed by CategoryTree
+        self.total = count
+        # position in CategoryTree.nodes
+        self.index = None
+
+    def __repr__(self):
+        return "<Node {} {}>".format(self.pk, self.name)
+
+    def is_leaf(self):
+        return not self.children
+
+    def descendant_count(self):
+        return (self.rght - self.lft - 1) // 2
+
+    def ancestors(self, include_self=False):
+        """From the root down to the parent (or self), ex: for breadcrumbs"""
+        path = [self] if include_self else []
+        parent = self.parent
+        while parent is not None:
+            path.append(parent)
+            parent = parent.parent
+        path.reverse()
+        return path
+
+
+class CategoryTree:
+    def __init__(self, rows):
+        """
+        rows:
+            Tuples of FIELDS and the nr. of items of the category.
+        """
+        # in tree order, the descendants of a node come right after it
+        self.nodes = [Node(*row) for row in sorted(rows, key=lambda r: (r[2], r[3]))]
+        self.by_pk = {}
+        self.by_slug = {}
+        for index, node in enumerate(self.nodes):
+            node.index = index
+            self.by_pk[node.pk] = node
+            self.by_slug[node.slug] = node
+        for node in self.nodes:
+            node.parent = self.by_pk.get(node.parent_id)
+            if node.parent is not None:
+                node.parent.children.append(node)
+        # deepest first, so the children are summed before their parent
+        for node in sorted(self.nodes, key=lambda node: -node.level):
+            if node.parent is not None:
+                node.parent.total += node.total
+
+    def get(self, pk):
+        return self.by_pk.get(pk)
+
+    def get_by_slug(self, slug):
+        return self.by_slug.get(slug)
+
+    def roots(self):
+        return [node for node in self.nodes if node.parent is None]
+
+    def descendants(self, node, include_self=False):
+        start = node.index if include_self else node.index + 1
+        return self.nodes[start : node.index + 1 + node.descendant_count()]
+
+
+def version_name(label):
+    return "tree.{}".format(label.lower())
+
+
+def build(label):
+    """Reads the tree of the category model label, one query"""
+    for category_label, item_label, fk_name, count, cumulative in COUNTERS:
+        if category_label == label:
+            break
+    else:
+        raise LookupError("No category tree for {}".format(label))
+    return CategoryTree(apps.get_model(label).objects.values_list(*FIELDS, count))
+
+
+def _version(label):
+    return (
+        Sequence.objects.filter(name=version_name(label))
+        .values_list("value", flat=True)
+        .first()
+    )
+
+
+def get_tree(model):
+    """Returns the CategoryTree of the category model, rebuilt if it changed"""
+    label = model._meta.label
+    ttl = getattr(settings, "CATEGORY_TREE_TTL", 5)
+    snapshot = _snapshots.get(label)
+    now = time.monotonic()
+    if snapshot is not None and now - snapshot[2] < ttl:
+        return snapshot[0]
+    version = _version(label)
+    if snapshot is not None and snapshot[1] == version:
+        _snapshots[label] = (snapshot[0], version, now)
+        return snapshot[0]
+    tree = build(label)
+    _snapshots[label] = (tree, version, now)
+    return tree
+
+
+def get_node(model, pk):
+    """
+    The node of the category pk. The tree is rebuilt at once if the category
+    isn't in it, ex: it was just added by another process.
+    """
+    node = get_tree(model).get(pk)
+    if node is None:
+        _snapshots.pop(model._meta.label, None)
+        node = get_tree(model).get(pk)
+    return node
+
+
+def _bump(label):
+    allocate(version_name(label))
+    _snapshots.pop(label, None)
+
+
+def invalidate(label):
+    """
+    Bumps the version of the tree, every process rebuilds it. After the commit,
+    so the version row isn't locked for the rest of the transaction.
+    """
+    transaction.on_commit(lambda: _bump(label))
+
+
+def category_changed(sender, **kwargs):
+    """post_save, post_delete and node_moved of the category models"""
+    invalidate(sender._meta.label)
+
+
+def item_changed(sender, instance, created=None, **kwargs):
+    """
+    post_save and post_delete of the items. The counts change only when an item
+    is added, deleted or moved to another category, not on every save.
+    Connected before counters.item_saved, which updates _counted_category_id.
+    """
+    for category_label, item_label, fk_name, *counts in COUNTERS:
+        if sender._meta.label != item_label:
+            continue
+        category_id = instance.__dict__.get(fk_name + "_id")
+        # created is None for post_delete
+        moved = category_id != getattr(instance, "_counted_category_id", None)
+        if created is not False or moved:
+            invalidate(category_label)
@@ -0,0 +1,201 @@
+"""
+Chunked, resumable uploads of big photo batches.
+The client creates an Upload, sends the file in chunks of at most
+CHUNKED_UPLOAD_MAX_CHUNK bytes and asks for the offset to go on after an
+interruption. Chunks are streamed to one file on disk, which is moved into
+the media storage when it's attached, so it's never read again.
+"""
+import os
+import shutil
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from PIL import Image
+
+from .models import Upload
+
+
+BLOCK_SIZE = 64 * 1024
+
+# {format detected by Pillow: extension of the stored file}
+IMAGE_FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
+
+
+class OffsetMismatch(ValueError):
+    """The chunk doesn't start where the upload is, the client should ask for the offset"""
+
+
+def upload_dir():
+    """
+    Directory of the unfinished uploads. It must be on the same filesystem as
+    MEDIA_ROOT, so a finished file is moved with a rename.
+    """
+    directory = getattr(settings, "CHUNKED_UPLOAD_DIR", None) or os.path.join(
+        os.path.dirname(os.path.normpath(settings.MEDIA_ROOT)), "chunked_uploads"
+    )
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def upload_path(upload):
+    return os.path.join(upload_dir(), "{}.part".format(upload.pk))
+
+
+def max_size():
+    return getattr(settings, "CHUNKED_UPLOAD_MAX_SIZE", 100 * 1024 * 1024)
+
+
+def max_chunk():
+    return getattr(settings, "CHUNKED_UPLOAD_MAX_CHUNK", 8 * 1024 * 1024)
+
+
+def start(user, filename, size):
+    """Returns a new Upload, ValueError if the file is too big"""
+    size = int(size)
+    if size < 0 or size > max_size():
+        raise ValueError("The file must be at most {} bytes".format(max_size()))
+    upload = Upload.objects.create(
+        user=user, filename=os.path.basename(filename)[:255], size=size
+    )
+    open(upload_path(upload), "wb").close()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Copies length bytes from stream (ex: the request) to the file at offset,
+    one block at a time. The bytes that arrived are kept even if the client
+    disconnects in the middle, so the next chunk starts after them.
+    Returns the new offset.
+    """
+    if offset != upload.offset:
+        raise OffsetMismatch("Expected offset {}".format(upload.offset))
+    if length > max_chunk() or offset + length > upload.size:
+        raise ValueError("Chunk too big")
+
+    written = 0
+    try:
+        with open(upload_path(upload), "r+b") as part:
+            part.seek(offset)
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                part.write(block)
+                written += len(block)
+    finally:
+        # conditional, a concurrent chunk for the same offset can't be counted twice
+        Upload.objects.filter(pk=upload.pk, offset=offset).update(
+            offset=offset + written, modified=timezone.now()
+        )
+        upload.offset = offset + written
+    return upload.offset
+
+
+class UploadedPart(File):
+    """
+    A finished upload. FileSystemStorage moves files that have a
+    temporary_file_path() instead of copying them.
+    """
+
+    def __init__(self, upload, path=None, name=None):
+        self.path = path or upload_path(upload)
+        super().__init__(None, name=name or upload.filename)
+        self.size = upload.size
+
+    def temporary_file_path(self):
+        return self.path
+
+    def open(self, mode="rb"):
+        self.file = open(self.path, mode)
+        return self
+
+    def chunks(self, chunk_size=None):
+        # used by storages that can't move the file
+        with open(self.path, "rb") as part:
+            yield from iter(lambda: part.read(chunk_size or BLOCK_SIZE), b"")
+
+
+def image_name(upload):
+    """
+    The name the upload is stored with, ex: "photo.jpg", with the extension of
+    the format Pillow finds in the file, not the one sent by the client.
+    ValueError if the file isn't a jpeg, png, gif or webp image.
+    """
+    stem, extension = os.path.splitext(upload.filename)
+    if extension.lower().lstrip(".") not in IMAGE_EXTENSIONS:
+        raise ValueError("{} isn't an image".format(upload.filename))
+    try:
+        with Image.open(upload_path(upload)) as image:
+            image_format = image.format
+            image.verify()
+    except Exception as e:
+        raise ValueError("{} isn't an image".format(upload.filename)) from e
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError("{} isn't an image".format(upload.filename))
+    return "{}.{}".format(stem or "photo", IMAGE_FORMATS[image_format])
+
+
+def _link(upload):
+    """
+    A second name of the part file, the storage moves it away. The part itself
+    is removed after the commit, a rollback leaves the upload as it was.
+    """
+    path = upload_path(upload) + ".attach"
+    if os.path.exists(path):
+        os.remove(path)
+    try:
+        os.link(upload_path(upload), path)
+    except OSError:
+        shutil.copyfile(upload_path(upload), path)
+    return path
+
+
+def _remove_parts(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def attach(uploads, obj, photo_model, fk_name, field="photo"):
+    """
+    Creates a photo_model row for each finished upload, ex: AlbumPhotos of obj,
+    in one transaction. The uploads are deleted. Returns the photos.
+    ValueError if an upload is unfinished or isn't an image, nothing is saved then.
+    """
+    uploads = list(uploads)
+    unfinished = [upload.pk for upload in uploads if not upload.is_complete()]
+    if unfinished:
+        raise ValueError("Unfinished uploads {}".format(unfinished))
+    names = [image_name(upload) for upload in uploads]
+    # before upload.delete() clears the pks
+    parts = [upload_path(upload) for upload in uploads]
+
+    photos = []
+    links = []
+    try:
+        with transaction.atomic():
+            for upload, name in zip(uploads, names):
+                links.append(_link(upload))
+                photo = photo_model(**{fk_name: obj})
+                getattr(photo, field).save(
+                    name, UploadedPart(upload, links[-1], name), save=False
+                )
+                photo.save()
+                upload.delete()
+                photos.append(photo)
+            transaction.on_commit(lambda: _remove_parts(parts))
+    finally:
+        # the links the storage didn't move, ex: after an error
+        _remove_parts(links)
+    return photos
+
+
+def discard(upload):
+    if os.path.exists(upload_path(upload)):
+        os.remove(upload_path(upload))
+    upload.delete()
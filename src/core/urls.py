@@ -8,6 +8,8 @@ app_name = "core"
 
 urlpatterns = [
     path("", views.home_page, name="home"),
+    path("uploads/", views.upload_start, name="upload_start"),
+    path("uploads/<int:pk>/", views.upload_chunk, name="upload_chunk"),
     path(
         "logged_out/",
         TemplateView.as_view(template_name="core/logged_out.html"),
@@ -1,7 +1,133 @@
-from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
+import json
+
+from django.contrib.auth.decorators import login_required, permission_required
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST
+
+from . import uploads
+from .models import Upload
+from .ordering import move_to, reorder
 
 
 @login_required()
 def home_page(request):
     return render(request, "core/home.html")
+
+
+def move_view(model, field, permission, redirect_to, lookup_field="pk"):
+    """
+    Returns a view that moves one object to a position, 0 is the first, ex:
+    path("<int:pk>/move/<int:position>/", move_view(Invoice, "invoice_nr", ...))
+    """
+
+    @permission_required(permission, raise_exception=True)
+    def view(request, position, **kwargs):
+        obj = get_object_or_404(model, **{lookup_field: kwargs[lookup_field]})
+        move_to(obj, field, position)
+        return redirect(redirect_to)
+
+    return view
+
+
+def reorder_view(model, field, permission):
+    """
+    Returns a view for drag and drop on list pages. It receives the pks in the new
+    order, as a json list {"order": [3, 1, 2]} or a form field order=3,1,2,
+    and saves the order with one UPDATE.
+    """
+
+    @require_POST
+    @permission_required(permission, raise_exception=True)
+    def view(request):
+        try:
+            if request.content_type == "application/json":
+                pks = json.loads(request.body)["order"]
+            else:
+                pks = request.POST["order"].split(",")
+            pks = [int(pk) for pk in pks]
+            reorder(model, field, pks)
+        except (KeyError, TypeError, ValueError) as e:
+            return HttpResponseBadRequest(str(e))
+        return JsonResponse({"order": pks})
+
+    return view
+
+
+def _upload_json(upload, status=200):
+    return JsonResponse(
+        {
+            "id": upload.pk,
+            "offset": upload.offset,
+            "size": upload.size,
+            "complete": upload.is_complete(),
+            "url": reverse("core:upload_chunk", kwargs={"pk": upload.pk}),
+        },
+        status=status,
+    )
+
+
+@login_required()
+@require_POST
+def upload_start(request):
+    """Starts a chunked upload, form fields filename and size (bytes)"""
+    try:
+        upload = uploads.start(
+            request.user, request.POST["filename"], request.POST["size"]
+        )
+    except (KeyError, ValueError) as e:
+        return HttpResponseBadRequest(str(e))
+    return _upload_json(upload, status=201)
+
+
+@login_required()
+@require_http_methods(["GET", "PUT"])
+def upload_chunk(request, pk):
+    """
+    GET returns the offset to resume from.
+    PUT writes the request body at the offset in the Upload-Offset header,
+    409 with the right offset if it's not where the upload is.
+    """
+    upload = get_object_or_404(Upload, pk=pk, user=request.user)
+    if request.method == "PUT":
+        try:
+            offset = int(request.META["HTTP_UPLOAD_OFFSET"])
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+            uploads.write_chunk(upload, offset, request, length)
+        except uploads.OffsetMismatch:
+            return _upload_json(upload, status=409)
+        except (KeyError, ValueError) as e:
+            return HttpResponseBadRequest(str(e))
+    return _upload_json(upload)
+
+
+def attach_uploads_view(model, photo_model, fk_name, permission, lookup_field="pk"):
+    """
+    Returns a view that adds finished chunked uploads to an object as photos,
+    in one transaction. It receives the upload ids as a json list
+    {"uploads": [3, 4]} or a form field uploads=3,4, ex:
+    path("<int:pk>/photos/", attach_uploads_view(Album, AlbumPhotos, "album", ...))
+    """
+
+    @require_POST
+    @permission_required(permission, raise_exception=True)
+    def view(request, **kwargs):
+        obj = get_object_or_404(model, **{lookup_field: kwargs[lookup_field]})
+        try:
+            if request.content_type == "application/json":
+                pks = json.loads(request.body)["uploads"]
+            else:
+                pks = request.POST["uploads"].split(",")
+            pks = [int(pk) for pk in pks]
+            pending = Upload.objects.filter(pk__in=pks, user=request.user)
+            if len(pending) != len(set(pks)):
+                raise ValueError("Unknown uploads in {}".format(pks))
+            photos = uploads.attach(pending, obj, photo_model, fk_name)
+        except (KeyError, TypeError, ValueError) as e:
+            return HttpResponseBadRequest(str(e))
+        return JsonResponse(
+            {"photos": [{"id": photo.pk, "url": photo.photo.url} for photo in photos]}
+        )
+
+    return view
@@ -241,3 +241,59 @@ else:
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # this is for 10MB
 FILE_UPLOAD_PERMISSIONS = 0o644
+
+# Background jobs, run by: python manage.py run_jobs
+# If True jobs run in the request, after the transaction commits
+JOBS_EAGER = False
+JOBS_MAX_ATTEMPTS = 3
+# Seconds before a running job whose worker died is run again
+JOBS_TIMEOUT = 600
+# Seconds before a failed job is retried, doubled after every attempt
+JOBS_RETRY_DELAY = 30
+
+# If set, private media files (ex: invoice pdfs) are sent by nginx with X-Accel-Redirect,
+# ex: "/protected-media/" with an internal nginx location pointing to MEDIA_ROOT
+PROTECTED_MEDIA_ACCEL_PREFIX = None
+
+# Processes rendering the missing pdfs of export_invoices, None is the nr. of CPUs
+INVOICE_EXPORT_WORKERS = None
+
+# Image of the first page of invoice pdfs, WIDTH in pixels or None to use only the DPI
+INVOICE_THUMBNAIL_DPI = 100
+INVOICE_THUMBNAIL_WIDTH = None
+INVOICE_THUMBNAIL_FORMAT = "JPEG"  # or "WEBP"
+INVOICE_THUMBNAIL_QUALITY = 80
+# processes used by the regenerate_invoice_thumbnails command
+INVOICE_THUMBNAIL_WORKERS = 2
+
+# Variants of uploaded photos, {name: width in pixels}, made by the job worker
+# or by: python manage.py generate_image_variants
+IMAGE_VARIANTS = {"thumb": 320, "medium": 800, "full": 1600}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+
+# Chunked photo uploads, the unfinished files are kept in CHUNKED_UPLOAD_DIR,
+# None is a chunked_uploads directory next to MEDIA_ROOT (same filesystem)
+CHUNKED_UPLOAD_DIR = None
+CHUNKED_UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK = 8 * 1024 * 1024
+
+# Seconds a process uses its cached category tree before checking for changes
+# made by other processes, see core/trees.py
+CATEGORY_TREE_TTL = 5
+
+# Activity log, actions are buffered and written with one INSERT every
+# ACTIVITY_FLUSH_INTERVAL seconds or ACTIVITY_BATCH_SIZE actions, see activity/buffer.py
+ACTIVITY_WRITE_BEHIND = True
+ACTIVITY_FLUSH_INTERVAL = 2
+ACTIVITY_BATCH_SIZE = 100
+# actions kept in memory while the database is down, the oldest are dropped first
+ACTIVITY_MAX_PENDING = 10000
+
+# Permissions cached per process, see core/backends.py and core/metadata.py
+AUTHENTICATION_BACKENDS = ["core.backends.CachedModelBackend"]
+# Seconds a process uses its cached site, content types and permissions before
+# checking for changes made by other processes
+METADATA_TTL = 5
+# Cached permission sets per process, two per user, the least recently used go first
+METADATA_MAX_PERMISSIONS = 2000
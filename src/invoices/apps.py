@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class InvoiceConfig(AppConfig):
     name = "invoices"
+
+    def ready(self):
+        from .utils import render_status_after_migrate
+
+        # invoices rendered before render_status existed, see invoices/utils.py
+        post_migrate.connect(render_status_after_migrate, sender=self)
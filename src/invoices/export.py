@@ -0,0 +1,143 @@
+import os
+import zipfile
+
+from django.conf import settings
+from django.db.models import Q
+
+from core.pools import map_bounded
+
+from .models import Invoice
+from .utils import get_pdf, pdf_fingerprint, pdf_is_current, schedule_render
+
+
+BLOCK_SIZE = 64 * 1024
+CHUNK_SIZE = 500
+# lists the invoices left out of the zip because their pdf is being rendered
+MISSING_NAME = "missing.txt"
+MISSING_TEXT = "These pdfs are being rendered, export the invoices again later:\n"
+
+
+def filter_invoices(
+    date_from=None, date_to=None, customer=None, nr_from=None, nr_to=None
+):
+    """Returns the invoices to export, every filter is optional"""
+    invoices = Invoice.objects.order_by("invoice_nr")
+    if date_from:
+        invoices = invoices.filter(created__date__gte=date_from)
+    if date_to:
+        invoices = invoices.filter(created__date__lte=date_to)
+    if customer:
+        invoices = invoices.filter(
+            Q(customer_name__icontains=customer)
+            | Q(customer_company_name__icontains=customer)
+        )
+    if nr_from is not None:
+        invoices = invoices.filter(invoice_nr__gte=nr_from)
+    if nr_to is not None:
+        invoices = invoices.filter(invoice_nr__lte=nr_to)
+    return invoices
+
+
+def _render_pdf(invoice_id):
+    """Runs in a pool process, renders the pdf if it's missing or outdated"""
+    invoice = Invoice.objects.get(pk=invoice_id)
+    get_pdf(invoice)
+    return invoice
+
+
+def _in_chunks(invoices):
+    """Yields the invoices with their products, CHUNK_SIZE invoices are loaded at a time"""
+    pks = list(invoices.values_list("pk", flat=True))
+    for start in range(0, len(pks), CHUNK_SIZE):
+        chunk = Invoice.objects.filter(pk__in=pks[start : start + CHUNK_SIZE])
+        yield from chunk.order_by("invoice_nr").prefetch_related("products")
+
+
+def _render_in_pool(pks, workers=None):
+    """Renders the pdfs in a process pool, see core/pools.py"""
+    workers = workers or getattr(settings, "INVOICE_EXPORT_WORKERS", None)
+    for pk, invoice, error in map_bounded(
+        _render_pdf, ((pk, pk) for pk in pks), workers
+    ):
+        if error:
+            raise ValueError("Invoice {} could not be rendered: {}".format(pk, error))
+        yield invoice
+
+
+def iter_invoice_pdfs(invoices, workers=None, missing=None):
+    """
+    Yields invoices with an up to date pdf file.
+    missing (list):
+        The invoices without one are added to it and not yielded, ex: in a
+        request, which doesn't wait for them. If it's None they are rendered in
+        a process pool after the others and yielded as soon as each one is ready.
+    """
+    pending = []
+    for invoice in _in_chunks(invoices):
+        if pdf_is_current(invoice, pdf_fingerprint(invoice)):
+            yield invoice
+        else:
+            pending.append(invoice)
+    if missing is not None:
+        missing.extend(pending)
+    elif pending:
+        yield from _render_in_pool([invoice.pk for invoice in pending], workers)
+
+
+class ZipStream:
+    """
+    Write only file object for zipfile, which collects what is written
+    so it can be sent to the client and forgotten.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        chunks, self.chunks = self.chunks, []
+        return b"".join(chunks)
+
+
+def stream_zip(invoices, workers=None, render=True):
+    """
+    Yields a zip archive with the pdfs of the invoices, one block at a time.
+    Pdfs are already compressed, so they are stored without compression.
+    Memory use doesn't depend on the number or the size of the pdfs.
+    render (bool):
+        False leaves out the missing pdfs, they are queued for the job worker
+        and listed in MISSING_NAME, ex: for a request.
+    """
+    missing = None if render else []
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for invoice in iter_invoice_pdfs(invoices, workers=workers, missing=missing):
+            info = zipfile.ZipInfo(
+                "Invoice_{}.pdf".format(invoice.slug),
+                date_time=invoice.modified.timetuple()[:6],
+            )
+            info.file_size = os.path.getsize(invoice.pdf.path)
+            with invoice.pdf.open("rb") as pdf, archive.open(info, mode="w") as entry:
+                for block in iter(lambda: pdf.read(BLOCK_SIZE), b""):
+                    entry.write(block)
+                    yield stream.pop()
+            yield stream.pop()
+        if missing:
+            for invoice in missing:
+                schedule_render(invoice)
+            names = ["Invoice_{}.pdf".format(invoice.slug) for invoice in missing]
+            archive.writestr(MISSING_NAME, MISSING_TEXT + "\n".join(names) + "\n")
+            yield stream.pop()
+    # the central directory, written when the archive is closed
+    yield stream.pop()
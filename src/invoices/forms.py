@@ -14,6 +14,8 @@ class InvoiceCreateForm(models.ModelForm):
             "image",
             "invoice_nr",
             "invoice_number",
+            "render_status",
+            "pdf_fingerprint",
         )
         widgets = {
             "visible_notes": Textarea(attrs={"rows": 4, "cols": 15}),
@@ -31,6 +33,8 @@ class InvoiceUpdateForm(models.ModelForm):
             "image",
             "invoice_nr",
             "invoice_number",
+            "render_status",
+            "pdf_fingerprint",
         )
         labels = {"invoice_title": "", "content": ""}
         widgets = {
@@ -81,3 +85,13 @@ class InvoiceUpdateForm(models.ModelForm):
             "visible_notes": Textarea(attrs={"rows": 4, "cols": 15}),
             "private_notes": Textarea(attrs={"rows": 4, "cols": 15}),
         }
+
+
+class InvoiceExportForm(forms.Form):
+    """Filters for the zip export of invoice pdfs, all of them are optional"""
+
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    customer = forms.CharField(max_length=200, required=False)
+    nr_from = forms.IntegerField(min_value=0, required=False)
+    nr_to = forms.IntegerField(min_value=0, required=False)
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from invoices.export import filter_invoices, stream_zip
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a zip with the pdfs of the filtered invoices, ex:"
+        " python manage.py export_invoices invoices.zip --date-from 2020-01-01"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Path of the zip file to write.")
+        parser.add_argument("--date-from", type=date.fromisoformat)
+        parser.add_argument("--date-to", type=date.fromisoformat)
+        parser.add_argument(
+            "--customer", help="Part of the customer name or company name."
+        )
+        parser.add_argument("--nr-from", type=int)
+        parser.add_argument("--nr-to", type=int)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Processes rendering the missing pdfs, defaults to the nr. of CPUs.",
+        )
+
+    def handle(self, *args, **options):
+        invoices = filter_invoices(
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            customer=options["customer"],
+            nr_from=options["nr_from"],
+            nr_to=options["nr_to"],
+        )
+        count = invoices.count()
+        with open(options["output"], "wb") as output:
+            for block in stream_zip(invoices, workers=options["workers"]):
+                output.write(block)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Exported {} invoices to {}".format(count, options["output"])
+            )
+        )
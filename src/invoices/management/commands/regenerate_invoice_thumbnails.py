@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from invoices.models import Invoice
+from invoices.thumbnails import render_thumbnails
+from invoices.utils import save_image
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the image of the first page again for every invoice with a pdf,"
+        " ex: after changing INVOICE_THUMBNAIL_DPI or INVOICE_THUMBNAIL_FORMAT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Processes rendering the images, defaults to INVOICE_THUMBNAIL_WORKERS.",
+        )
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only render invoices without an image.",
+        )
+
+    def handle(self, *args, **options):
+        invoices = Invoice.objects.exclude(pdf="").exclude(pdf=None).order_by("pk")
+        if options["missing_only"]:
+            invoices = invoices.filter(image="") | invoices.filter(image=None)
+        invoices = {
+            invoice.pk: invoice for invoice in invoices.only("pk", "pdf", "image")
+        }
+
+        items = ((pk, invoice.pdf.path) for pk, invoice in invoices.items())
+        done = failed = 0
+        for pk, image, error in render_thumbnails(items, workers=options["workers"]):
+            if error:
+                failed += 1
+                self.stderr.write("Invoice {}: {}".format(pk, error))
+                continue
+            invoice = invoices[pk]
+            save_image(invoice, image=image)
+            # update() instead of save(), so the slug isn't recalculated
+            Invoice.objects.filter(pk=pk).update(image=invoice.image.name)
+            done += 1
+
+        self.stdout.write(
+            self.style.SUCCESS("Rendered {} images, {} failed".format(done, failed))
+        )
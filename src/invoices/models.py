@@ -3,13 +3,22 @@ from django.db import models
 from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 from django.urls import reverse
-from django.utils.text import slugify
 
 from core.models import TimeStampedModel
+from core.slugs import save_with_unique_slug, unique_slug
 from products.models import Product
 
 
 class Invoice(TimeStampedModel):
+    RENDER_PENDING = "pending"
+    RENDER_DONE = "done"
+    RENDER_FAILED = "failed"
+    RENDER_STATUS = (
+        (RENDER_PENDING, "Rendering"),
+        (RENDER_DONE, "Rendered"),
+        (RENDER_FAILED, "Rendering failed"),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="user_invoices"
     )
@@ -52,6 +61,12 @@ class Invoice(TimeStampedModel):
 
     pdf = models.FileField(upload_to="invoices/pdfs/", null=True, blank=True)
     image = models.ImageField(upload_to="invoices/images/", null=True, blank=True)
+    # pdf and image are rendered by a background job, see invoices.utils
+    render_status = models.CharField(
+        max_length=16, choices=RENDER_STATUS, default=RENDER_PENDING
+    )
+    # fingerprint of the data the pdf was rendered from, see invoices.utils
+    pdf_fingerprint = models.CharField(max_length=64, blank=True)
 
     def __str__(self):
         return self.invoice_title
@@ -65,22 +80,14 @@ class Invoice(TimeStampedModel):
     def get_pdf_url(self):
         return reverse("invoices:invoice_pdf", kwargs={"pk": self.pk})
 
+    def is_rendered(self):
+        """True when the pdf and the image of the first page can be shown"""
+        return self.render_status == self.RENDER_DONE and bool(self.image)
+
     def get_unique_slug(self):
         """Changes the slug if 2 or more objects are created with the same title"""
-        slug = slugify(self.invoice_title)
-        unique_slug = slug
-        num = 1
-        while Invoice.objects.filter(slug=unique_slug).exists():
-            unique_slug = "{}-{}".format(slug, num)
-            num += 1
-        return unique_slug
+        return unique_slug(Invoice, self.invoice_title, exclude_pk=self.pk)
 
     def save(self, *args, **kwargs):
         """Change slug if you change the title"""
-        slug = slugify(self.invoice_title)
-        if self.slug != slug:
-            self.slug = slug
-
-            if self.slug:
-                self.slug = self.get_unique_slug()
-        super(Invoice, self).save()
+        save_with_unique_slug(self, self.invoice_title, super().save, *args, **kwargs)
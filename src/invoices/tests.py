@@ -1,4 +1,33 @@
-from django.test import TestCase
+import base64
+import json
 
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from accounts.models import User
+from core.pagination import paginate
+
+from .models import Invoice
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+class InvoicePaginationTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("invoices@example.com", "blu_admin", "pw")
+        for nr in range(1, 4):
+            Invoice.objects.create(
+                invoice_title="Invoice {}".format(nr), user=user, invoice_nr=nr
+            )
+
+    def page(self, **params):
+        request = RequestFactory().get("/invoices/", params)
+        return paginate(request, Invoice.objects.all(), ("invoice_nr", "pk"), 2)
+
+    def test_broken_cursor_shows_the_first_page(self):
+        first = [invoice.pk for invoice in self.page()]
+        for broken in (cursor(["abc", 1]), cursor([1]), "not a cursor"):
+            page = self.page(after=broken)
+            self.assertEqual([invoice.pk for invoice in page], first)
+            self.assertFalse(page.has_previous)
@@ -0,0 +1,59 @@
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+
+from core.pools import map_bounded
+from pdf2image import convert_from_path
+
+
+FORMATS = {"JPEG": "jpg", "WEBP": "webp"}
+
+
+def thumbnail_options():
+    """Thumbnail settings, see INVOICE_THUMBNAIL_* in settings.py"""
+    return {
+        "dpi": getattr(settings, "INVOICE_THUMBNAIL_DPI", 100),
+        "width": getattr(settings, "INVOICE_THUMBNAIL_WIDTH", None),
+        "image_format": getattr(settings, "INVOICE_THUMBNAIL_FORMAT", "JPEG"),
+        "quality": getattr(settings, "INVOICE_THUMBNAIL_QUALITY", 80),
+    }
+
+
+def thumbnail_extension(image_format):
+    return FORMATS[image_format.upper()]
+
+
+def render_thumbnail(pdf_path, dpi=100, width=None, image_format="JPEG", quality=80):
+    """
+    Returns the first page of the pdf as encoded image bytes.
+    poppler writes the page to a pipe and it's read straight into memory,
+    no temporary files. Doesn't touch the database, so it can run in a pool process.
+    width (int):
+        If given the page is scaled to this width, keeping the aspect ratio.
+    """
+    pages = convert_from_path(
+        pdf_path, dpi, first_page=1, last_page=1, size=(width, None) if width else None
+    )
+    page = pages[0]
+    output = BytesIO()
+    options = {"quality": quality}
+    if image_format.upper() == "JPEG":
+        options["optimize"] = True
+        page = page.convert("RGB")
+    elif image_format.upper() == "WEBP":
+        options["method"] = 6
+    page.save(output, image_format.upper(), **options)
+    return output.getvalue()
+
+
+def render_thumbnails(items, workers=None):
+    """
+    Renders thumbnails in a process pool, see core/pools.py
+    items:
+        Iterable of (pk, pdf_path).
+    Yields (pk, image bytes, error) in the order of items.
+    """
+    workers = workers or getattr(settings, "INVOICE_THUMBNAIL_WORKERS", 2)
+    render = partial(render_thumbnail, **thumbnail_options())
+    return map_bounded(render, items, workers)
@@ -8,6 +8,8 @@ app_name = "invoices"
 urlpatterns = [
     path("", views.invoice_list, name="invoice_list"),
     path("create/", views.invoice_create, name="invoice_create"),
+    path("export/", views.export_pdfs, name="export_pdfs"),
+    path("reorder/", views.reorder_invoices, name="reorder"),
     path("<slug:slug>/", views.invoice_detail, name="invoice_detail"),
     path("<slug:slug>/update/", views.invoice_update, name="invoice_update"),
     path("<slug:slug>/delete/", views.invoice_delete, name="invoice_delete"),
@@ -15,5 +17,6 @@ urlpatterns = [
     # path("<int:pk>/pdf2/", views.generatepdf, name="generatepdf"),
     path("<int:pk>/left/", views.move_left, name="left"),
     path("<int:pk>/right/", views.move_right, name="right"),
+    path("<int:pk>/move/<int:position>/", views.move_invoice, name="move"),
     path("<int:pk>/pdf_download/", views.DownloadPDF.as_view(), name="pdf_download",),
 ]
@@ -0,0 +1,202 @@
+import hashlib
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.template.loader import get_template
+
+from core.helpers import write_pdf
+from core.jobs import enqueue
+from core.models import Job
+
+from .models import Invoice
+from .thumbnails import render_thumbnail, thumbnail_extension, thumbnail_options
+
+
+INVOICE_TEMPLATE = "invoices/invoice.html"
+# the invoice fields INVOICE_TEMPLATE shows, keep it in sync with the template.
+# Not invoice_nr, it is only in commented out markup and rebalance_ordering
+# renumbers it, which would render every pdf again.
+FINGERPRINT_FIELDS = ("invoice_title", "invoice_number", "created")
+
+
+@lru_cache(maxsize=None)
+def template_version():
+    """
+    Hash of the invoice template source, so changing the template renders the pdfs again.
+    INVOICE_TEMPLATE_VERSION can be bumped to do the same for changes in static files.
+    Calculated once per process.
+    """
+    source = get_template(INVOICE_TEMPLATE).template.source
+    version = getattr(settings, "INVOICE_TEMPLATE_VERSION", "")
+    return hashlib.sha256((version + source).encode("utf-8")).hexdigest()
+
+
+def pdf_fingerprint(invoice):
+    """
+    Returns a hash of everything the pdf is rendered from: FINGERPRINT_FIELDS,
+    the linked products and the template version. Costs one query for the products,
+    none if they were prefetched.
+    """
+    digest = hashlib.sha256(template_version().encode("utf-8"))
+    for name in FINGERPRINT_FIELDS:
+        value = getattr(invoice, name)
+        digest.update("{}={!r};".format(name, value).encode("utf-8"))
+    # all() instead of values_list(), so prefetch_related("products") is used
+    products = sorted((p.pk, p.modified) for p in invoice.products.all())
+    for pk, modified in products:
+        digest.update("product={}@{};".format(pk, modified.isoformat()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def pdf_is_current(invoice, fingerprint):
+    """True if the stored pdf was rendered from the same data"""
+    return (
+        invoice.pdf_fingerprint == fingerprint
+        and bool(invoice.pdf)
+        and invoice.pdf.storage.exists(invoice.pdf.name)
+    )
+
+
+def get_pdf(invoice):
+    """
+    Returns the stored pdf file of the invoice, rendering it only if the invoice,
+    its products or the template changed since the last time.
+    """
+    fingerprint = pdf_fingerprint(invoice)
+    if not pdf_is_current(invoice, fingerprint):
+        save_pdf(invoice)
+        invoice.pdf_fingerprint = fingerprint
+        Invoice.objects.filter(pk=invoice.pk).update(
+            pdf=invoice.pdf.name, pdf_fingerprint=fingerprint
+        )
+        # the image of the first page may be outdated too
+        enqueue(
+            "invoices.utils.render_image", key=str(invoice.pk), invoice_id=invoice.pk
+        )
+    return invoice.pdf
+
+
+def schedule_render(invoice):
+    """
+    Marks the invoice as rendering and queues the pdf and image generation,
+    so the request doesn't wait for xhtml2pdf and poppler.
+    """
+    Invoice.objects.filter(pk=invoice.pk).update(render_status=Invoice.RENDER_PENDING)
+    invoice.render_status = Invoice.RENDER_PENDING
+    return enqueue(
+        "invoices.utils.render_invoice", key=str(invoice.pk), invoice_id=invoice.pk
+    )
+
+
+def save_pdf(invoice):
+    """Renders the invoice template to pdf and stores it in the pdf field"""
+    context = {
+        "invoice": invoice,
+    }
+    # rendered straight into the buffer that is written to the storage, no copies
+    result = BytesIO()
+    if not write_pdf(INVOICE_TEMPLATE, result, context):
+        raise ValueError("Invoice {} could not be rendered to pdf".format(invoice.pk))
+    result.seek(0)
+    filename = f"Invoice_{invoice.slug}.pdf"
+    # remove the old file, otherwise the storage keeps it and adds a suffix to the new one
+    if invoice.pdf:
+        invoice.pdf.delete(save=False)
+    # save=False, the caller stores the fields without calling Invoice.save()
+    invoice.pdf.save(filename, File(result), save=False)
+
+
+def save_image(invoice, image=None):
+    """
+    Saves an image of the first page of the pdf file in the image field.
+    image (bytes):
+        Already rendered thumbnail, ex: from invoices.thumbnails.render_thumbnails
+    """
+    options = thumbnail_options()
+    if image is None:
+        image = render_thumbnail(invoice.pdf.path, **options)
+    base_filename = os.path.splitext(os.path.basename(invoice.pdf.name))[0]
+    filename = "{}.{}".format(
+        base_filename, thumbnail_extension(options["image_format"])
+    )
+    # remove the old file, otherwise the storage keeps it and adds a suffix to the new one
+    if invoice.image:
+        invoice.image.delete(save=False)
+    invoice.image.save(filename, ContentFile(image), save=False)
+
+
+def render_invoice(invoice_id):
+    """Background job, renders the pdf and the image of the first page."""
+    invoice = Invoice.objects.filter(pk=invoice_id).first()
+    if invoice is None:
+        # deleted before the worker got to it
+        return
+    fingerprint = pdf_fingerprint(invoice)
+    current = pdf_is_current(invoice, fingerprint)
+    if current and invoice.image:
+        # saved without changes, nothing to render
+        Invoice.objects.filter(pk=invoice.pk).update(render_status=Invoice.RENDER_DONE)
+        return
+    try:
+        if not current:
+            save_pdf(invoice)
+            # recorded at once, so a retry after a failed image reuses this file
+            # instead of leaving it behind. update() instead of save(), so the
+            # slug isn't recalculated
+            Invoice.objects.filter(pk=invoice.pk).update(
+                pdf=invoice.pdf.name, pdf_fingerprint=fingerprint
+            )
+        save_image(invoice)
+    except Exception:
+        Invoice.objects.filter(pk=invoice.pk).update(
+            render_status=Invoice.RENDER_FAILED
+        )
+        raise
+    Invoice.objects.filter(pk=invoice.pk).update(
+        image=invoice.image.name, render_status=Invoice.RENDER_DONE
+    )
+
+
+def render_image(invoice_id):
+    """Background job, renders the image of the first page from the stored pdf."""
+    invoice = Invoice.objects.filter(pk=invoice_id).first()
+    if invoice is None or not invoice.pdf:
+        return
+    save_image(invoice)
+    Invoice.objects.filter(pk=invoice.pk).update(image=invoice.image.name)
+
+
+def reconcile_render_status():
+    """
+    For the pending invoices without a render job queued, ex: the ones made
+    before render_status was added. The ones with a pdf and an image are marked
+    as rendered, the others are queued. Returns the nr. of both.
+    """
+    queued = Job.objects.filter(
+        task="invoices.utils.render_invoice", status__in=(Job.PENDING, Job.RUNNING)
+    ).values_list("key", flat=True)
+    stale = Invoice.objects.filter(render_status=Invoice.RENDER_PENDING).exclude(
+        pk__in=[int(key) for key in queued if key.isdigit()]
+    )
+    rendered = (
+        stale.exclude(pdf="")
+        .exclude(pdf__isnull=True)
+        .exclude(image="")
+        .exclude(image__isnull=True)
+        .update(render_status=Invoice.RENDER_DONE)
+    )
+    missing = 0
+    # the ones left after the update
+    for invoice in stale:
+        schedule_render(invoice)
+        missing += 1
+    return rendered, missing
+
+
+def render_status_after_migrate(sender, **kwargs):
+    """post_migrate receiver of the invoices app, connected in InvoiceConfig.ready"""
+    reconcile_render_status()
@@ -1,23 +1,22 @@
-import os
-import tempfile
-from io import BytesIO
-
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.mixins import PermissionRequiredMixin
-from django.core.files import File
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views import View
 
 from activity.utils import create_action
-from core.helpers import increment_account_number, render_to_pdf
-from pdf2image import convert_from_path
-
-from .forms import InvoiceCreateForm, InvoiceUpdateForm
+from core.downloads import serve_file
+from core.helpers import increment_account_number
+from core.ordering import next_position, swap_with_neighbour
+from core.pagination import paginate
+from core.views import move_view, reorder_view
+
+from .export import filter_invoices, stream_zip
+from .forms import InvoiceCreateForm, InvoiceExportForm, InvoiceUpdateForm
 from .models import Invoice
+from .utils import get_pdf, schedule_render
 
 
 User = get_user_model()
@@ -25,46 +24,21 @@ User = get_user_model()
 
 @permission_required("invoices.add_invoice", raise_exception=True)
 def invoice_create(request):
-    last_object = Invoice.objects.order_by("-pk").first()
-
     form = InvoiceCreateForm(request.POST or None, request.FILES or None)
     if form.is_valid():
         # first save the invoice object
         instance = form.save(commit=False)
         instance.user = request.user
-        # if any objects exists, last_obj.invoice_nr + 1, else invoice_nr 1
-        instance.invoice_nr = 1 if not last_object else int(last_object.invoice_nr) + 1
-        if last_object is None:
-            instance.invoice_number = "BLU-00001"
-        else:
+        # numbers come from sequences that stay locked until the invoice is saved,
+        # so two invoices created at the same time can't get the same number
+        with transaction.atomic():
+            instance.invoice_nr = next_position(Invoice, "invoice_nr")
             instance.invoice_number = increment_account_number()
-        instance.save()
+            instance.save()
 
         create_action(request.user, "created invoice", instance, instance)
-        # save the pdf field from the object fields
-        context = {
-            "invoice": instance,
-        }
-        pdf = render_to_pdf("invoices/invoice.html", context)
-        filename = f"Invoice_{instance.slug}.pdf"
-        a = instance.pdf.save(filename, File(BytesIO(pdf.content)))
-        # print(a)
-
-        # save image from first page of pdf file
-        filename = instance.pdf.path
-        with tempfile.TemporaryDirectory() as path:
-            images_from_path = convert_from_path(
-                filename, 100, output_folder=path, last_page=1, first_page=0
-            )
-        base_filename = os.path.splitext(os.path.basename(filename))[0] + ".jpg"
-        save_dir = os.path.join(settings.MEDIA_ROOT, "invoices/images/")
-        for page in images_from_path:
-            page.save(os.path.join(save_dir, base_filename), "JPEG")
-
-            instance.image = "{}".format(
-                os.path.join("invoices/images/", base_filename)
-            )
-            instance.save()
+        # the pdf and the image of the first page are rendered by the job worker
+        schedule_render(instance)
 
         return redirect("invoices:invoice_list")
 
@@ -78,20 +52,8 @@ def invoice_create(request):
 def invoice_list(request):
     invoices = Invoice.objects.all().order_by("invoice_nr")
 
-    page = request.GET.get("page", 1)
-    paginator = Paginator(invoices, 6)
-    try:
-        objects = paginator.page(page)
-    except PageNotAnInteger:
-        objects = paginator.page(1)
-    except EmptyPage:
-        objects = paginator.page(paginator.num_pages)
-    index = objects.number - 1
-    max_index = len(paginator.page_range)
-    start_index = index - 3 if index >= 3 else 0
-    end_index = index + 3 if index <= max_index - 3 else max_index
-    page_range = paginator.page_range[start_index:end_index]
-    context = {"object_list": objects, "page_range": page_range}
+    objects = paginate(request, invoices, ("invoice_nr", "pk"), 6)
+    context = {"object_list": objects}
 
     return render(request, "invoices/invoice_list.html", context)
 
@@ -117,31 +79,8 @@ def invoice_update(request, slug):
             instance.user = request.user
             instance.save()
             create_action(request.user, "updated invoice", instance, instance)
-
-            # save the pdf field from the object fields
-            context = {
-                "invoice": instance,
-            }
-            pdf = render_to_pdf("invoices/invoice.html", context)
-            filename = f"Invoice_{instance.slug}.pdf"
-            a = instance.pdf.save(filename, File(BytesIO(pdf.content)))
-            # print(a)
-
-            # save image from first page of pdf file
-            filename = instance.pdf.path
-            with tempfile.TemporaryDirectory() as path:
-                images_from_path = convert_from_path(
-                    filename, 100, output_folder=path, last_page=1, first_page=0,
-                )
-            base_filename = os.path.splitext(os.path.basename(filename))[0] + ".jpg"
-            save_dir = os.path.join(settings.MEDIA_ROOT, "invoices/images/")
-            for page in images_from_path:
-                page.save(os.path.join(save_dir, base_filename), "JPEG")
-
-                instance.image = "{}".format(
-                    os.path.join("invoices/images/", base_filename)
-                )
-                instance.save()
+            # the pdf and the image of the first page are rendered by the job worker
+            schedule_render(instance)
 
             return redirect("invoices:invoice_list")
         else:
@@ -164,16 +103,9 @@ def invoice_delete(request, slug):
 @permission_required("invoices.view_invoice", raise_exception=True)
 def invoice_pdf(request, pk):
     invoice = get_object_or_404(Invoice, pk=pk)
-    context = {
-        "invoice": invoice,
-    }
-    pdf = render_to_pdf("invoices/invoice.html", context)
-    filename = f"Invoice_{invoice.slug}.pdf"
-    if invoice.pdf is None:
-        invoice.pdf.save(filename, File(BytesIO(pdf.content)))
-    else:
-        pass
-    return HttpResponse(pdf, content_type="application/pdf")
+    # rendered only if the invoice changed since the last download
+    pdf = get_pdf(invoice)
+    return serve_file(request, pdf, "application/pdf", etag=invoice.pdf_fingerprint)
 
 
 # @receiver(pre_save, sender=Invoice)
@@ -190,16 +122,16 @@ class DownloadPDF(PermissionRequiredMixin, View):
 
     def get(self, request, pk, **kwargs):
         invoice = get_object_or_404(Invoice, pk=pk)
-        context = {
-            "invoice": invoice,
-        }
-        pdf = render_to_pdf("invoices/invoice.html", context)
-
-        response = HttpResponse(pdf, content_type="application/pdf")
+        pdf = get_pdf(invoice)
         filename = f"Invoice_{invoice.slug}.pdf"
-        content = "attachment; filename='%s'" % filename
-        response["Content-Disposition"] = content
-        return response
+        return serve_file(
+            request,
+            pdf,
+            "application/pdf",
+            filename=filename,
+            as_attachment=True,
+            etag=invoice.pdf_fingerprint,
+        )
 
 
 # @login_required
@@ -219,51 +151,42 @@ class DownloadPDF(PermissionRequiredMixin, View):
 #     return response
 
 
+@permission_required("invoices.view_invoice", raise_exception=True)
+def export_pdfs(request):
+    """
+    Downloads a zip with the pdfs of the filtered invoices, ex:
+    /invoices/export/?date_from=2020-01-01&date_to=2020-03-31&customer=blu
+    The archive is sent while it's being written. Missing pdfs are queued for the
+    job worker and listed in missing.txt instead of rendered in the request.
+    """
+    form = InvoiceExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    invoices = filter_invoices(**form.cleaned_data)
+    response = StreamingHttpResponse(
+        stream_zip(invoices, render=False), content_type="application/zip"
+    )
+    response["Content-Disposition"] = 'attachment; filename="invoices.zip"'
+    return response
+
+
 @permission_required("invoices.change_invoice", raise_exception=True)
 def move_left(request, pk):
     invoice = get_object_or_404(Invoice, pk=pk)
-    current_invoice = invoice.invoice_nr
-
-    previous_invoice = (
-        Invoice.objects.filter(invoice_nr__lt=invoice.invoice_nr)
-        .order_by("-invoice_nr")
-        .first()
-    )
-    if previous_invoice is not None:
-        # change invoice_nr for current invoice with previous invoice
-        invoice_new = previous_invoice.invoice_nr
-        invoice.invoice_nr = invoice_new
-
-        # change previous invoice invoice_nr with current invoice :)
-        previous_invoice.invoice_nr = current_invoice
-        # save both invoice instances
-        invoice.save()
-        previous_invoice.save()
-    else:
-        pass
+    # swaps invoice_nr with the previous invoice, one UPDATE without calling save()
+    swap_with_neighbour(invoice, "invoice_nr", previous=True)
     return redirect("invoices:invoice_list")
 
 
 @permission_required("invoices.change_invoice", raise_exception=True)
 def move_right(request, pk):
     invoice = get_object_or_404(Invoice, pk=pk)
-    current_invoice = invoice.invoice_nr
-
-    previous_invoice = (
-        Invoice.objects.filter(invoice_nr__gt=invoice.invoice_nr)
-        .order_by("invoice_nr")
-        .first()
-    )
-    if previous_invoice is not None:
-        # change invoice_nr for current invoice with previous invoice
-        invoice_new = previous_invoice.invoice_nr
-        invoice.invoice_nr = invoice_new
-
-        # change previous invoice invoice_nr with current invoice :)
-        previous_invoice.invoice_nr = current_invoice
-        # save both invoice instances
-        invoice.save()
-        previous_invoice.save()
-    else:
-        pass
+    # swaps invoice_nr with the next invoice, one UPDATE without calling save()
+    swap_with_neighbour(invoice, "invoice_nr", previous=False)
     return redirect("invoices:invoice_list")
+
+
+move_invoice = move_view(
+    Invoice, "invoice_nr", "invoices.change_invoice", "invoices:invoice_list"
+)
+reorder_invoices = reorder_view(Invoice, "invoice_nr", "invoices.change_invoice")
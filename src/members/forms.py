@@ -35,9 +35,25 @@ class UserEditForm(forms.ModelForm):
 
 
 class UserTypeEditForm(forms.ModelForm):
+    expiration_date = forms.ChoiceField()
+
     class Meta:
         model = User
-        fields = ("user_type", "expiration_date")
+        fields = ("user_type",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        choices = User.expiration_choices()
+        current = self.instance.get_expiration()
+        if current not in dict(choices):
+            # a date set earlier, ex: "one week" chosen a few days ago
+            choices.insert(1, (current, current))
+        self.fields["expiration_date"].choices = choices
+        self.fields["expiration_date"].initial = current
+
+    def save(self, commit=True):
+        self.instance.set_expiration(self.cleaned_data["expiration_date"])
+        return super().save(commit=commit)
 
 
 class ProfileUsernameEditForm(forms.ModelForm):
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+
+User = get_user_model()
+
+
+def parse_expiration_date(value):
+    """The date of an old expiration_date like "2020-05-31", None if it isn't one"""
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Sets expires_on and never_expires of every member from the old"
+        " expiration_date strings. Run it once after the migration adding them,"
+        " before the one dropping the old column."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only show what would be set."
+        )
+
+    def handle(self, *args, **options):
+        legacy = User.objects.exclude(legacy_expiration_date="")
+        endless = legacy.filter(legacy_expiration_date__iexact=User.ENDLESSLY)
+        expired = legacy.filter(legacy_expiration_date__iexact=User.EXPIRED)
+        dated = []
+        unknown = []
+        rows = legacy.exclude(
+            legacy_expiration_date__iregex=r"^({}|{})$".format(
+                User.ENDLESSLY, User.EXPIRED
+            )
+        ).values_list("pk", "email", "legacy_expiration_date")
+        for pk, email, value in rows:
+            expires_on = parse_expiration_date(value)
+            if expires_on is None:
+                unknown.append((email, value))
+            else:
+                dated.append(User(pk=pk, expires_on=expires_on, never_expires=False))
+
+        for email, value in unknown:
+            self.stdout.write(
+                "Not a date, left as never expiring: {} {!r}".format(email, value)
+            )
+        if options["dry_run"]:
+            self.stdout.write(
+                "{} never expire, {} expired, {} with a date".format(
+                    endless.count(), expired.count(), len(dated)
+                )
+            )
+            return
+
+        with transaction.atomic():
+            never = endless.update(never_expires=True, expires_on=None)
+            gone = expired.update(never_expires=False)
+            User.objects.bulk_update(
+                dated, ["expires_on", "never_expires"], batch_size=options["batch_size"]
+            )
+        self.stdout.write(
+            "{} never expire, {} expired, {} with a date".format(
+                never, gone, len(dated)
+            )
+        )
@@ -5,10 +5,23 @@ This script is meant to reduce the size of log files if they reach a certain siz
 This will be run by a cron job, so all paths must be absolute.
 """
 
+import argparse
+import gzip
 import logging
 import logging.handlers
 import os
-from pathlib import Path
+import shutil
+import tempfile
+import time
+
+
+LOG_FILES = [
+    "/home/django/django_project/src/members/management/commands/update_member_expiration_date.txt",
+]
+# files bigger than this are cut in half
+MAX_SIZE = 100 * 1024 * 1024
+# bytes copied at a time, the memory used doesn't depend on the size of the log
+BUFFER_SIZE = 1024 * 1024
 
 
 def email_logs(error):
@@ -30,32 +43,108 @@ def email_logs(error):
     return get_logger
 
 
-def shorten_file(file_in, file_out):
-    file_size = Path(file_in).stat().st_size
-    # get file size in megabytes
-    file_size_mb = file_size / (1024 * 1024)
-    # if file size is bigger than 100 MB
-    if file_size_mb >= 100:
-        with open(file_in, "r") as f_in, open(file_out, "w") as f_out:
-            lines = f_in.readlines()
-            # get half of lines number
-            half_of_lines_nr = int(len(lines) / 2)
-            # copy to file out last half of lines
-            half_of_lines = lines[half_of_lines_nr:]
-            for line in half_of_lines:
-                f_out.write(line)
+def tail_offset(f, size):
+    """Offset of the first line starting in the second half of the file"""
+    middle = size // 2
+    if middle == 0:
+        return 0
+    # from the byte before the middle, so a line starting at the middle is kept
+    f.seek(middle - 1)
+    f.readline()
+    return f.tell()
 
-        os.remove(file_in)
-        os.rename(file_out, file_in)
 
+def copy_range(f_in, f_out, offset, count, sendfile=True):
+    """
+    Copies count bytes of f_in from offset, with os.sendfile if it can.
+    sendfile must be False if f_out isn't a plain file, ex: gzip.
+    """
+    if sendfile and hasattr(os, "sendfile"):
+        try:
+            while count > 0:
+                sent = os.sendfile(f_out.fileno(), f_in.fileno(), offset, count)
+                if sent == 0:
+                    return
+                offset += sent
+                count -= sent
+            return
+        except OSError:
+            # not supported between these files, the rest is copied below
+            pass
+    f_in.seek(offset)
+    while count > 0:
+        chunk = f_in.read(min(BUFFER_SIZE, count))
+        if not chunk:
+            return
+        f_out.write(chunk)
+        count -= len(chunk)
 
-if __name__ == "__main__":
 
-    try:
+def archive_head(f_in, offset, path):
+    """Writes the first offset bytes to path.<time>.gz, returns its name"""
+    name = "{}.{}.gz".format(path, time.strftime("%Y%m%d-%H%M%S"))
+    with gzip.open(name, "wb") as f_out:
+        copy_range(f_in, f_out, 0, offset, sendfile=False)
+    return name
+
+
+def shorten_file(path, max_size=MAX_SIZE, archive=False):
+    """
+    If the file is bigger than max_size, keeps the lines of its second half.
+    The tail is copied to a temporary file next to it, which then replaces it,
+    so the log is never half written. With archive, the removed head is kept
+    gzipped. Returns the nr. of bytes removed.
+    """
+    size = os.path.getsize(path)
+    if size < max_size:
+        return 0
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with open(path, "rb") as f_in:
+        offset = tail_offset(f_in, size)
+        if archive:
+            archive_head(f_in, offset, path)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f_out:
+            try:
+                copied = offset
+                # lines written to the log while copying are copied too
+                while True:
+                    size = os.fstat(f_in.fileno()).st_size
+                    if copied >= size:
+                        break
+                    f_out.flush()
+                    copy_range(f_in, f_out, copied, size - copied)
+                    copied = size
+                f_out.flush()
+                os.fsync(f_out.fileno())
+                shutil.copymode(path, f_out.name)
+                os.replace(f_out.name, path)
+            except BaseException:
+                os.remove(f_out.name)
+                raise
+    return offset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="*", default=LOG_FILES, help="Log files")
+    parser.add_argument(
+        "--max-size", type=int, default=MAX_SIZE // (1024 * 1024), help="MB"
+    )
+    parser.add_argument(
+        "--archive", action="store_true", help="Keep the removed half gzipped."
+    )
+    options = parser.parse_args()
+    for path in options.paths:
         shorten_file(
-            "/home/django/django_project/src/members/management/commands/update_member_expiration_date.txt",
-            "/home/django/django_project/src/members/management/commands/update_member_expiration_date_temporary.txt",
+            path, max_size=options.max_size * 1024 * 1024, archive=options.archive
         )
+
+
+if __name__ == "__main__":
+
+    try:
+        main()
     except Exception as e:
         print(f'An error "{e}" occurred and an email with the error was sent to admin.')
         # logger.exception(e)
@@ -1,6 +1,6 @@
 import logging
 import logging.handlers
-from datetime import date, datetime
+from datetime import datetime
 
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
@@ -36,26 +36,62 @@ def email_logs(error):
 
 class Command(BaseCommand):
     help = (
-        "Checks members expiration date. If it's today make member inactive,"
-        " so they can't login adn do nothing on the site"
+        "Makes the members whose expiration date is today or earlier inactive,"
+        " so they can't login and do nothing on the site. One UPDATE on the"
+        " indexed expires_on, or --batch-size rows per UPDATE."
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the members that would expire.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows per UPDATE, so the locks are held shortly. All at once by default.",
+        )
+        parser.add_argument(
+            "--within",
+            type=int,
+            default=None,
+            help="With --dry-run, also list the members expiring in the next days.",
+        )
+
+    def expire(self, expiring, batch_size):
+        """Returns the nr. of members made inactive"""
+        values = {"is_active": False}
+        if not batch_size:
+            return expiring.update(**values)
+        expired = 0
+        while True:
+            pks = list(expiring.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return expired
+            # the conditions again, a member may have been renewed in between
+            expired += expiring.filter(pk__in=pks).update(**values)
+
     def handle(self, *args, **options):
         try:
-            users = User.objects.all()
-            for user in users:
-                # print(user, user.expiration_date)
-                # if user.expiration_date is datetime it begins with year 2020
-                if user.expiration_date[0] == "2":
-                    user_exp_dt_date_obj = datetime.strptime(
-                        user.expiration_date, "%Y-%m-%d"
-                    ).date()
-
-                    if user_exp_dt_date_obj == date.today():
-                        obj = User.objects.get(pk=user.pk)
-                        obj.expiration_date = "Expired"
-                        obj.is_active = False
-                        obj.save()
+            expiring = User.objects.expired()
+            if options["dry_run"]:
+                for email, expires_on in expiring.values_list("email", "expires_on"):
+                    self.stdout.write("{} {}".format(expires_on, email))
+                self.stdout.write("{} members would expire".format(expiring.count()))
+                if options["within"] is not None:
+                    soon = User.objects.expiring_within(options["within"])
+                    for email, expires_on in soon.values_list("email", "expires_on"):
+                        self.stdout.write("{} {}".format(expires_on, email))
+                    self.stdout.write(
+                        "{} members expire in the next {} days".format(
+                            soon.count(), options["within"]
+                        )
+                    )
+                return
+            expired = self.expire(expiring, options["batch_size"])
+            self.stdout.write("{} members expired".format(expired))
 
         except Exception as e:
             print(
@@ -10,7 +10,15 @@ User = get_user_model()
 @permission_required("view_user", raise_exception=True)
 def all_members(request):
     members = User.objects.select_related("profile")
-    return render(request, "members/member_list.html", {"object_list": members})
+    expiring_within = request.GET.get("expiring_within", "")
+    if expiring_within.isdigit():
+        members = User.objects.expiring_within(int(expiring_within))
+        members = members.select_related("profile").order_by("expires_on")
+    return render(
+        request,
+        "members/member_list.html",
+        {"object_list": members, "expiring_within": expiring_within},
+    )
 
 
 @permission_required("change_user", raise_exception=True)
@@ -47,13 +55,8 @@ def edit_profile(request, pk=None):
         )
 
         if user_form.is_valid():
-            instance = user_form.save(commit=False)
-            expiration_date = user_form.cleaned_data.get("expiration_date")
-            if expiration_date != "expired":
-                instance.is_active = True
-            else:
-                instance.is_active = False
-            instance.save()
+            # sets is_active from the expiration date too
+            user_form.save()
         elif profile_username_form.is_valid():
             profile_username_form.save()
 
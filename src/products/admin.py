@@ -32,29 +32,17 @@ class ProductCategoryAdmin(MPTTModelAdmin):
     def products_link(self, albums):
         return "Category products"
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-
-        # Add cumulative albums count
-        qs = ProductCategory.objects.add_related_count(
-            qs, Product, "categories", "products_cumulative_count", cumulative=True,
-        )
-
-        # Add non cumulative albums count
-        qs = ProductCategory.objects.add_related_count(
-            qs, Product, "categories", "products_count", cumulative=False
-        )
-        return qs
-
     def related_products_count(self, instance):
         return instance.products_count
 
     related_products_count.short_description = "Nr. of products"
+    related_products_count.admin_order_field = "products_count"
 
     def related_products_cumulative_count(self, instance):
         return instance.products_cumulative_count
 
     related_products_cumulative_count.short_description = "Nr. of products (in tree)"
+    related_products_cumulative_count.admin_order_field = "products_cumulative_count"
 
 
 admin.site.register(ProductCategory, ProductCategoryAdmin)
@@ -69,7 +57,7 @@ class ProductAdmin(admin.ModelAdmin):
         "image_tag",
     ]
     list_display_links = ["verbose_name"]
-    list_select_related = ["categories"]
+    list_select_related = ["categories", "cover_photo"]
     list_filter = ["created", ("categories", TreeRelatedFieldListFilter)]
     prepopulated_fields = {"slug": ("verbose_name",)}
     list_per_page = 20
@@ -79,7 +67,9 @@ class ProductAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return (
-            super(ProductAdmin, self).get_queryset(request).select_related("categories")
+            super(ProductAdmin, self)
+            .get_queryset(request)
+            .select_related("categories", "cover_photo")
         )
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
@@ -93,7 +83,6 @@ class ProductAdmin(admin.ModelAdmin):
     @admin_link("categories", "categories")
     def category_link(self, category):
         """Url link for the categories of business."""
-        """With 20000 products this decorator increases the list page load from 800 ms to ~3000 ms"""
         return category
 
 
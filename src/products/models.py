@@ -1,10 +1,16 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.utils.text import slugify
 
+from core import counters
+from core.covers import photo_added, photo_deleted
 from core.models import TimeStampedModel
+from core.slugs import save_with_unique_slug, unique_slug
+from core.storage import photo_storage
 from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
 
@@ -25,9 +31,15 @@ class ProductCategory(MPTTModel, TimeStampedModel):
         db_index=True,
     )
     photo = models.ImageField(
-        upload_to="products/categories/", default="profiles/image-coming-soon.jpg",
+        upload_to="products/categories/",
+        default="profiles/image-coming-soon.jpg",
+        storage=photo_storage,
     )
     slug = models.SlugField(unique=True)
+    # nr. of products in the category, and with the subcategories,
+    # kept up to date by core.counters
+    products_count = models.PositiveIntegerField(default=0, editable=False)
+    products_cumulative_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -57,23 +69,14 @@ class ProductCategory(MPTTModel, TimeStampedModel):
 
     def _get_unique_slug(self):
         """Changes the slug if 2 or more objects are created with the same name"""
-        slug = slugify(self.name)
-        unique_slug = slug
-        num = 1
-        while ProductCategory.objects.filter(slug=unique_slug).exists():
-            unique_slug = "{}-{}".format(slug, num)
-            num += 1
-        return unique_slug
+        return unique_slug(ProductCategory, self.name, exclude_pk=self.pk)
 
     def save(self, *args, **kwargs):
         """Change slug if you change the name"""
-        slug = slugify(self.name)
-        if self.slug != slug:
-            self.slug = slug
-            # change the slug if if there's another instance with this slug
-            if self.slug:
-                self.slug = self._get_unique_slug()
-        super(ProductCategory, self).save()
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # the counts are kept by core.counters, not written from the instance
+            kwargs["update_fields"] = counters.update_fields(self)
+        save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
 
 
 class Product(TimeStampedModel):
@@ -154,6 +157,15 @@ class Product(TimeStampedModel):
     categories = models.ForeignKey(
         ProductCategory, on_delete=models.CASCADE, related_name="products",
     )
+    # oldest photo, kept up to date by the ProductPhotos receivers below
+    cover_photo = models.ForeignKey(
+        "ProductPhotos",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
 
     def __str__(self):
         return self.verbose_name
@@ -165,7 +177,8 @@ class Product(TimeStampedModel):
         return reverse("products:product_detail", kwargs={"slug": self.slug})
 
     def get_first_photo(self):
-        img = self.photos.last()
+        # no query if the list selects the cover_photo
+        img = self.cover_photo
         if img:
             return img.photo.url
         if not img:
@@ -175,10 +188,10 @@ class Product(TimeStampedModel):
         return self.photos.all()
 
     def image_tag(self):
-        if self.get_first_photo():
+        photo = self.get_first_photo()
+        if photo:
             return mark_safe(
-                '<img src="%s" style="max-width: 60px; max-height:60px;" />'
-                % self.get_first_photo()
+                '<img src="%s" style="max-width: 60px; max-height:60px;" />' % photo
             )
         else:
             return "No Image"
@@ -187,23 +200,11 @@ class Product(TimeStampedModel):
 
     def get_unique_slug(self):
         """Changes the slug if 2 or more objects are created with the same verbose_name"""
-        slug = slugify(self.verbose_name)
-        unique_slug = slug
-        num = 1
-        while Product.objects.filter(slug=unique_slug).exists():
-            unique_slug = "{}-{}".format(slug, num)
-            num += 1
-        return unique_slug
+        return unique_slug(Product, self.verbose_name, exclude_pk=self.pk)
 
     def save(self, *args, **kwargs):
         """Change slug if you change the verbose_name"""
-        slug = slugify(self.verbose_name)
-        if self.slug != slug:
-            self.slug = slug
-
-            if self.slug:
-                self.slug = self.get_unique_slug()
-        super(Product, self).save()
+        save_with_unique_slug(self, self.verbose_name, super().save, *args, **kwargs)
 
 
 def image_upload_to(instance, filename):
@@ -219,7 +220,9 @@ class ProductPhotos(TimeStampedModel):
         Product, on_delete=models.CASCADE, related_name="photos"
     )
     photo = models.ImageField(
-        upload_to=image_upload_to, default="profiles/image-coming-soon.jpg"
+        upload_to=image_upload_to,
+        default="profiles/image-coming-soon.jpg",
+        storage=photo_storage,
     )
 
     def __str__(self):
@@ -227,3 +230,14 @@ class ProductPhotos(TimeStampedModel):
 
     class Meta:
         ordering = ["-created"]
+
+
+@receiver(post_save, sender=ProductPhotos)
+def product_photo_saved(sender, instance, created, **kwargs):
+    if created:
+        photo_added(instance, "product")
+
+
+@receiver(post_delete, sender=ProductPhotos)
+def product_photo_deleted(sender, instance, **kwargs):
+    photo_deleted(instance, "product")
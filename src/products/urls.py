@@ -7,7 +7,10 @@ app_name = "products"
 
 urlpatterns = [
     path("", views.product_list, name="product_list"),
+    path("json/", views.product_list_json, name="product_list_json"),
     path("categories/", views.categories, name="category_list"),
+    path("reorder/", views.reorder_products, name="product_reorder"),
+    path("categories/reorder/", views.reorder_categories, name="category_reorder"),
     path(
         "category/<slug:slug>/create-product/",
         views.ProductCreate.as_view(),
@@ -16,11 +19,18 @@ urlpatterns = [
     path("category/create/", views.create_category, name="category_create"),
     path("category/<slug:slug>/left/", views.move_cat_left, name="category_left"),
     path("category/<slug:slug>/right/", views.move_cat_right, name="category_right",),
+    path(
+        "category/<slug:slug>/move/<int:position>/",
+        views.move_category,
+        name="category_move",
+    ),
     path(
         "<slug:slug>/update-product/",
         views.ProductUpdate.as_view(),
         name="product_edit",
     ),
+    path("<slug:slug>/move/<int:position>/", views.move_product, name="product_move"),
+    path("<slug:slug>/photos/", views.attach_photos, name="attach_photos"),
     path("<slug:slug>/", views.product_detail, name="product_detail"),
     path(
         "<slug:slug>/<slug:slug2>/delete/", views.product_delete, name="product_delete"
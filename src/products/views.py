@@ -1,12 +1,16 @@
 from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.mixins import PermissionRequiredMixin
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView, UpdateView
 
 from activity.utils import create_action
+from core.ordering import next_position, swap_with_neighbour
+from core.pagination import paginate, per_page
+from core.trees import get_node
+from core.views import attach_uploads_view, move_view, reorder_view
 
 from .forms import (
     ProductCategoryCreateForm,
@@ -14,18 +18,21 @@ from .forms import (
     ProductEditForm,
     ProductPhotosFormSet,
 )
-from .models import Product, ProductCategory
+from .models import Product, ProductCategory, ProductPhotos
+
+
+PRODUCTS_PER_PAGE = 6
 
 
 @permission_required("products.add_productcategory", raise_exception=True)
 def create_category(request):
-    last_object = ProductCategory.objects.order_by("-pk").first()
     form = ProductCategoryCreateForm(request.POST or None, request.FILES or None)
     if form.is_valid():
         instance = form.save(commit=False)
         instance.user = request.user
-        instance.cat_nr = 1 if not last_object else int(last_object.cat_nr) + 1
-        instance.save()
+        with transaction.atomic():
+            instance.cat_nr = next_position(ProductCategory, "cat_nr")
+            instance.save()
         create_action(request.user, "created category", instance, instance)
         return redirect("products:category_list")
     context = {
@@ -58,7 +65,10 @@ def category_edit(request, slug):
 
 @permission_required("products.view_productcategory", raise_exception=True)
 def categories(request):
-    all_categories = ProductCategory.objects.order_by("cat_nr")
+    all_categories = list(ProductCategory.objects.order_by("cat_nr"))
+    for category in all_categories:
+        # nr. of products in the category and its subcategories, without a query
+        category.node = get_node(ProductCategory, category.pk)
     return render(
         request, "products/category_list.html", {"categories": all_categories}
     )
@@ -67,27 +77,14 @@ def categories(request):
 @permission_required("products.view_productcategory", raise_exception=True)
 def category_detail(request, slug):
     category = get_object_or_404(ProductCategory, slug=slug)
-    products = category.products.prefetch_related("categories").order_by(
-        "product_nr"
-    )
+    products = category.products.select_related("cover_photo").order_by("product_nr")
 
-    page = request.GET.get("page", 1)
-    paginator = Paginator(products, 12)
-    try:
-        objects = paginator.page(page)
-    except PageNotAnInteger:
-        objects = paginator.page(1)
-    except EmptyPage:
-        objects = paginator.page(paginator.num_pages)
-    index = objects.number - 1
-    max_index = len(paginator.page_range)
-    start_index = index - 3 if index >= 3 else 0
-    end_index = index + 3 if index <= max_index - 3 else max_index
-    page_range = paginator.page_range[start_index:end_index]
+    objects = paginate(request, products, ("product_nr", "pk"), 12)
+    node = get_node(ProductCategory, category.pk)
     context = {
         "object_list": objects,
-        "page_range": page_range,
         "instance": category,
+        "node": node,
     }
     return render(request, "products/category_detail.html", context)
 
@@ -95,48 +92,16 @@ def category_detail(request, slug):
 @permission_required("products.view_productcategory", raise_exception=True)
 def move_cat_left(request, slug):
     category = get_object_or_404(ProductCategory, slug=slug)
-    current_category = category.cat_nr
-    previous_category = (
-        ProductCategory.objects.filter(cat_nr__lt=category.cat_nr)
-        .order_by("-cat_nr")
-        .first()
-    )
-    if previous_category is not None:
-        # change cat_nr for current category with previous category
-        category_new = previous_category.cat_nr
-        category.cat_nr = category_new
-
-        # change previous category cat_nr with current category :)
-        previous_category.cat_nr = current_category
-        # save both category instances
-        category.save()
-        previous_category.save()
-    else:
-        pass
+    # swaps cat_nr with the previous category, one UPDATE without calling save()
+    swap_with_neighbour(category, "cat_nr", previous=True)
     return redirect("products:category_list")
 
 
 @permission_required("products.view_productcategory", raise_exception=True)
 def move_cat_right(request, slug):
     category = get_object_or_404(ProductCategory, slug=slug)
-    current_category = category.cat_nr
-    previous_category = (
-        ProductCategory.objects.filter(cat_nr__gt=category.cat_nr)
-        .order_by("cat_nr")
-        .first()
-    )
-    if previous_category is not None:
-        # change cat_nr for current category with previous category
-        category_new = previous_category.cat_nr
-        category.cat_nr = category_new
-
-        # change previous category cat_nr with current category :)
-        previous_category.cat_nr = current_category
-        # save both category instances
-        category.save()
-        previous_category.save()
-    else:
-        pass
+    # swaps cat_nr with the next category, one UPDATE without calling save()
+    swap_with_neighbour(category, "cat_nr", previous=False)
     return redirect("products:category_list")
 
 
@@ -148,28 +113,45 @@ def category_delete(request, slug):
     return redirect("products:category_list")
 
 
-@permission_required("products.view_product", raise_exception=True)
-def product_list(request):
-    products = Product.objects.prefetch_related("user", "categories").order_by(
+def _product_page(request):
+    """One page of products with their category and cover photo, one query"""
+    products = Product.objects.select_related("categories", "cover_photo").order_by(
         "product_nr"
     )
-    page = request.GET.get("page", 1)
-    paginator = Paginator(products, 6)
-    try:
-        objects = paginator.page(page)
-    except PageNotAnInteger:
-        objects = paginator.page(1)
-    except EmptyPage:
-        objects = paginator.page(paginator.num_pages)
-    index = objects.number - 1
-    max_index = len(paginator.page_range)
-    start_index = index - 3 if index >= 3 else 0
-    end_index = index + 3 if index <= max_index - 3 else max_index
-    page_range = paginator.page_range[start_index:end_index]
-    context = {"object_list": products, "page_range": page_range}
+    return paginate(
+        request, products, ("product_nr", "pk"), per_page(request, PRODUCTS_PER_PAGE)
+    )
+
+
+@permission_required("products.view_product", raise_exception=True)
+def product_list(request):
+    context = {"object_list": _product_page(request)}
     return render(request, "products/product_list.html", context)
 
 
+@permission_required("products.view_product", raise_exception=True)
+def product_list_json(request):
+    """The next page of the product list for infinite scroll, follow "next" until it's null"""
+    page = _product_page(request)
+    results = [
+        {
+            "id": product.pk,
+            "slug": product.slug,
+            "verbose_name": product.verbose_name,
+            "sku": product.sku,
+            "product_nr": product.product_nr,
+            "category": product.categories.slug,
+            "photo": product.get_first_photo(),
+            "url": product.get_absolute_url(),
+        }
+        for product in page
+    ]
+    next_url = reverse("products:product_list_json") + page.next_url()
+    return JsonResponse(
+        {"results": results, "next": next_url if page.has_next else None}
+    )
+
+
 @permission_required("products.change_product", raise_exception=True)
 def product_detail(request, slug):
     product = get_object_or_404(Product, slug=slug)
@@ -227,10 +209,6 @@ class ProductCreate(PermissionRequiredMixin, CreateView):
         Overridden so we can make sure the `ProductCategory` instance exists
         before going any further.
         """
-        last_object = Product.objects.order_by("-pk").first()
-        self.product_nr = (
-            1 if not last_object else int(last_object.product_nr) + 1
-        )
         self.categories = get_object_or_404(ProductCategory, slug=kwargs["slug"])
         return super().dispatch(request, *args, **kwargs)
 
@@ -244,17 +222,13 @@ class ProductCreate(PermissionRequiredMixin, CreateView):
         return data
 
     def form_valid(self, form):
-        last_object = Product.objects.order_by("-pk").first()
         context = self.get_context_data()
         photos = context["photos"]
         with transaction.atomic():
             self.object = form.save(commit=False)
             self.object.user = self.request.user
             self.object.categories = self.categories
-            # if it's first object product_nr 1 else last product_nr + 1
-            self.object.product_nr = (
-                1 if not last_object else int(last_object.product_nr) + 1
-            )
+            self.object.product_nr = next_position(Product, "product_nr")
             self.object = form.save()
             if photos.is_valid():
                 photos.instance = self.object
@@ -328,50 +302,37 @@ class ProductUpdate(PermissionRequiredMixin, UpdateView):
 @permission_required("products.change_product", raise_exception=True)
 def move_product_left(request, cat_slug, slug):
     product = get_object_or_404(Product, slug=slug)
-    # category = get_object_or_404(ProductCategory, slug=cat_slug)
-    current_product = product.product_nr
-    previous_product = (
-        Product.objects.filter(product_nr__lt=product.product_nr)
-        .order_by("-product_nr")
-        .first()
-    )
-    if previous_product is not None:
-        # change product_nr for current product with previous product
-        product_new = previous_product.product_nr
-        product.product_nr = product_new
-
-        # change previous product product_nr with current product :)
-        previous_product.product_nr = current_product
-        # save both product instances
-        product.save()
-        previous_product.save()
-    else:
-        pass
-    # return redirect("products:product_list")
+    # swaps product_nr with the previous product, one UPDATE without calling save()
+    swap_with_neighbour(product, "product_nr", previous=True)
     return redirect("products:category_detail", slug=cat_slug)
 
 
 @permission_required("products.change_product", raise_exception=True)
 def move_product_right(request, cat_slug, slug):
     product = get_object_or_404(Product, slug=slug)
-    # category = get_object_or_404(ProductCategory, slug=cat_slug)
-    current_product = product.product_nr
-    previous_product = (
-        Product.objects.filter(product_nr__gt=product.product_nr)
-        .order_by("product_nr")
-        .first()
-    )
-    if previous_product is not None:
-        # change product_nr for current product with previous product
-        product_new = previous_product.product_nr
-        product.product_nr = product_new
-
-        # change previous product product_nr with current product :)
-        previous_product.product_nr = current_product
-        # save both product instances
-        product.save()
-        previous_product.save()
-    else:
-        pass
-    # return redirect("products:product_list")
+    # swaps product_nr with the next product, one UPDATE without calling save()
+    swap_with_neighbour(product, "product_nr", previous=False)
     return redirect("products:category_detail", slug=cat_slug)
+
+
+move_category = move_view(
+    ProductCategory,
+    "cat_nr",
+    "products.change_productcategory",
+    "products:category_list",
+    lookup_field="slug",
+)
+reorder_categories = reorder_view(
+    ProductCategory, "cat_nr", "products.change_productcategory"
+)
+move_product = move_view(
+    Product,
+    "product_nr",
+    "products.change_product",
+    "products:product_list",
+    lookup_field="slug",
+)
+reorder_products = reorder_view(Product, "product_nr", "products.change_product")
+attach_photos = attach_uploads_view(
+    Product, ProductPhotos, "product", "products.change_product", lookup_field="slug"
+)